@@ -1,16 +1,30 @@
 """
 Optimized Healthcare AI - Higher Confidence Version
 Improved model parameters for better confidence scores
+
+pandas, scikit-learn and joblib are imported where they are used, so a
+process that only serves predictions from exported arrays never loads them.
 """
 
-import pandas as pd
-import joblib
+import copy
+import io
+import json
 import os
-from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score
+import time
+import re
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
 import numpy as np
+from artifacts import (
+    BUNDLES_DIR, atomic_write, bundle_id, current_bundle, publish_link, read_manifest, verify_bundle, write_bundle,
+)
+from calibration import CALIBRATION_FILE, UNCALIBRATED, ConfidenceCalibrator
+from fast_path import FAST_PATH_FILE, DistilledModel
+from forest_arrays import ARRAYS_DIR, QUANTIZE_PARAMS, export_arrays, load_arrays
+from hashed_features import HASHING_PARAMS, HashingTfidfVectorizer
+from instrumentation import Metrics
+from result_store import ResultStore
 
 # Valid medical symptom terms
 VALID_SYMPTOMS = {
@@ -129,90 +143,406 @@ for disease in ["Bronchitis", "Allergic Rhinitis", "Urinary Tract Infection",
             "prevention": ["Healthy lifestyle", "Regular checkups", "Good hygiene"]
         }
 
-def is_emergency(text):
-    text_lower = text.lower()
-    return any(keyword in text_lower for keyword in EMERGENCY_KEYWORDS)
+def build_keyword_pattern(keywords):
+    # Compile the phrases into one trie-shaped regex: branches split on the
+    # next character, so a scan costs the same however many phrases there are
+    trie = {}
+    for keyword in keywords:
+        if not keyword:
+            continue
+        node = trie
+        for char in keyword.lower():
+            node = node.setdefault(char, {})
+        node[''] = True
+    return re.compile(_trie_to_regex(trie))
 
-def validate_symptoms(symptoms_text):
-    symptoms_text = symptoms_text.lower().strip()
-    
-    if len(symptoms_text) < 5:
-        return False, "⚠️ Please enter more details about your symptoms.", 0
-    
-    symptoms_list = [s.strip() for s in symptoms_text.replace(',', ' ').replace(';', ' ').split()]
-    symptoms_list = [s for s in symptoms_list if len(s) > 2]
+def _trie_to_regex(node):
+    branches = [re.escape(char) + _trie_to_regex(child)
+                for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        # Greedy optional tail: longest phrase wins, shorter one still matches
+        pattern = '(?:' + pattern + ')?'
+    return pattern
+
+# Commas and sentence breaks: phrases never run across one. "pain in left
+# arm, weakness" is two complaints, not "arm weakness"
+_SEGMENT_BREAKS = ',;.!?'
+
+# Every other character that is not a letter or digit becomes a space before
+# the whitespace is collapsed, as in preprocess_text. ASCII text goes through
+# a byte table, anything else through the equivalent Unicode regex
+_ASCII_SCREEN_TABLE = bytes(c if c < 128 and (chr(c).isalnum() or chr(c) in _SEGMENT_BREAKS) else 32
+                            for c in range(256))
+_NON_SCREEN_RUN = re.compile(r'(?:[^\w,;.!?]|_)+')
+
+def _screen_text(lowered):
+    # Words separated by single spaces, breaks kept where they were
+    if lowered.isascii():
+        return ' '.join(lowered.encode('ascii').translate(_ASCII_SCREEN_TABLE).decode('ascii').split())
+    return _NON_SCREEN_RUN.sub(' ', lowered).strip()
+
+# Endings a patient adds to a vocabulary word: "headaches", "coughing",
+# "feverish", "aching" (final e dropped)
+_SUFFIXES = ('s', 'es', 'ed', 'ing', 'y', 'ish', 'ful', 'ness')
+
+def _inflections(word):
+    if len(word) < 4:
+        return []
+    stems = (word, word[:-1]) if word.endswith('e') else (word,)
+    return [stem + suffix for stem in stems for suffix in _SUFFIXES]
+
+class PhraseSpans:
+    # Result of one PhraseExtractor pass, shared by validation, the
+    # emergency check and featurization
+    __slots__ = ('length', 'text', 'symptoms', 'emergencies')
     
-    medical_word_count = 0
-    for symptom in symptoms_list:
-        for valid_symptom in VALID_SYMPTOMS:
-            if symptom in valid_symptom or valid_symptom in symptom:
-                medical_word_count += 1
-                break
+    def __init__(self, length, text, symptoms, emergencies):
+        self.length = length
+        # The vectorizers only read words from it, so the same features as
+        # preprocess_text's output
+        self.text = text
+        self.symptoms = symptoms
+        self.emergencies = emergencies
+
+class PhraseExtractor:
+    # Both phrase lists compiled once into trie-shaped regexes (see
+    # build_keyword_pattern) that run over the same normalized text, so a
+    # request costs one normalization and two compiled scans whatever the
+    # vocabulary size. Symptom phrases match whole words, longest first and
+    # without overlap, and their last word also matches its usual
+    # inflections. Emergency phrases match as substrings, as the screen always
+    # has: compounds and inflections ("heatstroke", "seizures") still raise
+    # the alarm, and separator variants ("chest-pain") now do too. Neither
+    # matches across a comma or sentence break
+    def __init__(self, symptoms=VALID_SYMPTOMS, emergencies=EMERGENCY_KEYWORDS):
+        # Phrase as the patterns see it -> phrase as listed
+        self.symptom_forms = {}
+        for phrase in sorted(symptoms):
+            form = _screen_text(phrase.lower())
+            if form:
+                self.symptom_forms.setdefault(form, phrase)
+        # Exact forms first, so an inflection never shadows a listed phrase
+        for form, phrase in list(self.symptom_forms.items()):
+            head, _, last = form.rpartition(' ')
+            for inflected in _inflections(last):
+                self.symptom_forms.setdefault(f'{head} {inflected}'.lstrip(), phrase)
+        self.emergency_forms = {}
+        for phrase in emergencies:
+            form = _screen_text(phrase.lower())
+            if form:
+                self.emergency_forms.setdefault(form, phrase)
+        self.symptom_pattern = None
+        if self.symptom_forms:
+            words = build_keyword_pattern(self.symptom_forms).pattern
+            self.symptom_pattern = re.compile(r'(?<![^\W_])(?:' + words + r')(?![^\W_])')
+        self.emergency_pattern = build_keyword_pattern(self.emergency_forms) if self.emergency_forms else None
     
-    common_words = ['pain', 'ache', 'fever', 'cough', 'headache', 'sore', 'burning', 'swelling', 'itching']
-    for word in common_words:
-        if word in symptoms_text:
-            medical_word_count += 1
+    def extract(self, text):
+        lowered = text.lower()
+        screened = _screen_text(lowered)
+        symptoms, emergencies = [], []
+        if self.symptom_pattern is not None:
+            symptoms = [self.symptom_forms[form] for form in self.symptom_pattern.findall(screened)]
+        if self.emergency_pattern is not None:
+            emergencies = [self.emergency_forms[form] for form in self.emergency_pattern.findall(screened)]
+        return PhraseSpans(len(lowered.strip()), screened, symptoms, emergencies)
+
+# Built once at import; pass a different extractor to validate a larger vocabulary
+PHRASE_EXTRACTOR = PhraseExtractor()
+
+def find_emergency_keywords(text):
+    return PHRASE_EXTRACTOR.extract(text).emergencies
+
+def is_emergency(text):
+    return bool(PHRASE_EXTRACTOR.extract(text).emergencies)
+
+def validate_symptoms(symptoms_text, extractor=None):
+    return validate_spans((extractor or PHRASE_EXTRACTOR).extract(symptoms_text))
+
+def validate_spans(spans):
+    # Counts the distinct vocabulary phrases found, not words: "shortness of
+    # breath" is one symptom, a repeated symptom counts once, and a word that
+    # is only part of a phrase ("chest", "breath") or not in the vocabulary
+    # counts for nothing
+    if spans.length < 5:
+        return False, "⚠️ Please enter more details about your symptoms.", 0
     
-    if medical_word_count < 2:
+    found = len(set(spans.symptoms))
+    if found == 0:
         return False, "⚠️ Please describe symptoms using medical terms (e.g., 'fever, cough, headache').", 0
     
-    if len(symptoms_list) < 2:
-        return False, "⚠️ Please provide at least 2-3 symptoms (e.g., 'fever, cough, body ache').", len(symptoms_list)
+    if found < 2:
+        return False, "⚠️ Please provide at least 2-3 symptoms (e.g., 'fever, cough, body ache').", found
     
-    return True, "Valid symptoms", len(symptoms_list)
+    return True, "Valid symptoms", found
+
+# Characters other than letters, digits and commas become spaces before the
+# whitespace is collapsed; ASCII text goes through str.translate, anything
+# else through the equivalent Unicode regex (\w minus the underscore)
+_ASCII_TEXT_TABLE = {i: ' ' for i in range(128) if not (chr(i).isalnum() or chr(i) == ',')}
+_NON_TEXT_RUN = re.compile(r'(?:[^\w,]|_)+')
 
 def preprocess_text(text):
     text = text.lower()
-    text = ''.join(c if c.isalnum() or c.isspace() or c == ',' else ' ' for c in text)
-    return ' '.join(text.split())
+    if text.isascii():
+        return ' '.join(text.translate(_ASCII_TEXT_TABLE).split())
+    return _NON_TEXT_RUN.sub(' ', text).strip()
 
-class HealthcareAI:
+# NUL separates rows when a whole column is cleaned as one string
+_COLUMN_TEXT_TABLE = {i: c for i, c in _ASCII_TEXT_TABLE.items() if i != 0}
+
+def preprocess_series(texts):
+    # Whole-column variant of preprocess_text for the training path: one
+    # lower/translate/split over the joined column instead of a call per row
+    joined = '\0'.join(texts).lower()
+    if not joined.isascii() or joined.count('\0') != len(texts) - 1:
+        return texts.apply(preprocess_text)
+    joined = ' '.join(joined.translate(_COLUMN_TEXT_TABLE).split())
+    joined = joined.replace(' \0', '\0').replace('\0 ', '\0')
+    import pandas as pd
+    return pd.Series(joined.split('\0'), index=texts.index, name=texts.name)
+
+def cache_key(symptoms_clean):
+    # Commas, sentence breaks and spacing never reach the TF-IDF tokens, so
+    # drop them from the key; token order is kept because the 1-3-gram
+    # features depend on it
+    for mark in _SEGMENT_BREAKS:
+        symptoms_clean = symptoms_clean.replace(mark, ' ')
+    return ' '.join(symptoms_clean.split())
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    # Concurrent calls with the same key wait for the first one's result
+    # instead of computing it again; the key is forgotten once it completes
     def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key, compute):
+        # Returns (result, shared); errors reach every waiting caller
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = compute()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+    
+    def count_coalesced(self, n=1):
+        with self._lock:
+            self.coalesced += n
+    
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._flights), 'leaders': self.leaders, 'coalesced': self.coalesced}
+
+class PredictionCache:
+    # Thread-safe LRU of prediction results; maxsize=0 disables caching
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return dict(result)
+    
+    def put(self, key, result):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = dict(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+# Optimized TF-IDF parameters
+VECTORIZER_PARAMS = dict(
+    max_features=1000,  # Increased from 800
+    ngram_range=(1, 3),
+    min_df=2,
+    max_df=0.85,
+    sublinear_tf=True  # Better scaling
+)
+
+# Optimized Random Forest
+FOREST_PARAMS = dict(
+    n_estimators=200,      # Increased from 150
+    max_depth=30,          # Increased from 25
+    min_samples_split=2,   # Reduced from 3 for better fit
+    min_samples_leaf=1,    # Reduced from 2
+    max_features='sqrt',   # Better feature selection
+    random_state=42,
+    n_jobs=-1,
+    class_weight='balanced',
+    bootstrap=True,
+    oob_score=True        # Out-of-bag score
+)
+
+def split_dataset(df):
+    from sklearn.model_selection import train_test_split
+    # Stratified split for better balance
+    return train_test_split(
+        df['symptoms_clean'], df['disease'],
+        test_size=0.15,  # Reduced test size for more training data
+        random_state=42, 
+        stratify=df['disease']
+    )
+
+# train_incremental's checkpoint, saved in each bundle beside the model it describes
+CHECKPOINT_FILE = 'training_checkpoint.json'
+
+# Rows per disease carried between incremental trainings
+REPLAY_PER_DISEASE = 20
+
+def _replay_rows(texts, labels, per_disease=REPLAY_PER_DISEASE):
+    # Most recent rows of each disease
+    import pandas as pd
+    frame = pd.DataFrame({'symptoms_clean': list(texts), 'disease': list(labels)})
+    return frame.groupby('disease').tail(per_disease).values.tolist()
+
+def _load_checkpoint(bundle=None):
+    # The checkpoint published with the bundle's model, hash-checked like the
+    # rest of it; a loose file from before checkpoints were bundled otherwise
+    if bundle is not None and os.path.exists(os.path.join(bundle, CHECKPOINT_FILE)):
+        verify_bundle(bundle, lambda name: name == CHECKPOINT_FILE)
+        path = os.path.join(bundle, CHECKPOINT_FILE)
+    elif os.path.exists(CHECKPOINT_FILE):
+        path = CHECKPOINT_FILE
+    else:
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+class HealthcareAI:
+    def __init__(self, cache_size=1024, metrics=None, coalesce=True, result_store=None):
         self.model = None
         self.vectorizer = None
+        self.cache = PredictionCache(cache_size)
+        # Off unless asked for, or HEALTHCARE_AI_METRICS=1 is set
+        self.metrics = metrics or Metrics(enabled=os.environ.get('HEALTHCARE_AI_METRICS') == '1')
+        self.payloads = None
+        self._payloads_by_name = {}
+        # Distilled linear model tried before the forest; None means forest only
+        self.fast_path = None
+        # Maps the top probability to the reported confidence; None means raw probability
+        self.calibrator = None
+        # export_arrays options for a quantized array export; None exports exactly
+        self.quantize = None
+        # Everything a request needs, swapped as one reference (see LiveModel)
+        self.live = None
+        self.bundle = None
+        self._watcher = None
+        self._rejected_bundle = None
+        # Identical concurrent requests share one model pass (None turns it off)
+        self.flights = SingleFlight() if coalesce else None
+        self._async_flights = {}
+        # Results shared on disk across processes and restarts, used while a
+        # bundle is loaded: a path, a ResultStore, or HEALTHCARE_AI_RESULT_STORE
+        result_store = result_store or os.environ.get('HEALTHCARE_AI_RESULT_STORE')
+        self.store = ResultStore(result_store) if isinstance(result_store, str) else result_store
+        
+    def train(self, dataset_path='dataset_improved.csv', vectorizer_params=None, forest_params=None,
+              features='tfidf', distill=True, calibrate=True, chunk_size=None, spill_dir=None,
+              quantize=None):
+        # features='hashing' swaps the fitted vocabulary for hashed character
+        # n-grams; vectorizer_params then override HASHING_PARAMS.
+        # chunk_size streams the CSV instead of loading it whole, and
+        # spill_dir keeps the feature matrices in memory-mapped files.
+        # quantize=True (or a dict overriding QUANTIZE_PARAMS) compresses the
+        # exported arrays; the pickles stay exact
+        import pandas as pd
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.metrics import accuracy_score
         
-    def train(self, dataset_path='dataset_improved.csv'):
-        print("🔄 Loading dataset...")
-        df = pd.read_csv(dataset_path)
-        print(f"✅ Dataset loaded: {len(df)} records, {df['disease'].nunique()} diseases")
-        
-        df['symptoms_clean'] = df['symptoms'].apply(preprocess_text)
-        
-        # Stratified split for better balance
-        X_train, X_test, y_train, y_test = train_test_split(
-            df['symptoms_clean'], df['disease'],
-            test_size=0.15,  # Reduced test size for more training data
-            random_state=42, 
-            stratify=df['disease']
-        )
-        
-        print("🔧 Creating optimized features...")
-        # Optimized TF-IDF parameters
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,  # Increased from 800
-            ngram_range=(1, 3),
-            min_df=2,
-            max_df=0.85,
-            sublinear_tf=True  # Better scaling
-        )
-        X_train_tfidf = self.vectorizer.fit_transform(X_train)
-        X_test_tfidf = self.vectorizer.transform(X_test)
+        if features == 'hashing':
+            self.vectorizer = HashingTfidfVectorizer(**{**HASHING_PARAMS, **(vectorizer_params or {})})
+        elif features == 'tfidf':
+            # Optimized TF-IDF parameters
+            self.vectorizer = TfidfVectorizer(**{**VECTORIZER_PARAMS, **(vectorizer_params or {})})
+        else:
+            raise ValueError(f"features must be 'tfidf' or 'hashing', got {features!r}")
+        
+        if chunk_size:
+            from streaming import stream_dataset
+            print(f"🔄 Streaming dataset in chunks of {chunk_size:,} rows...")
+            data = stream_dataset(dataset_path, self.vectorizer, preprocess_series, chunk_size, spill_dir)
+            X_train_tfidf, X_test_tfidf, y_train, y_test = data.X_train, data.X_test, data.y_train, data.y_test
+            columns, replay = data.columns, data.replay
+            print(f"✅ Dataset streamed: {len(y_train) + len(y_test)} records, "
+                  f"{len(np.unique(y_train))} diseases")
+        else:
+            print("🔄 Loading dataset...")
+            df = pd.read_csv(dataset_path)
+            print(f"✅ Dataset loaded: {len(df)} records, {df['disease'].nunique()} diseases")
+            
+            df['symptoms_clean'] = preprocess_series(df['symptoms'])
+            
+            X_train, X_test, y_train, y_test = split_dataset(df)
+            
+            print("🔧 Creating optimized features...")
+            X_train_tfidf = self.vectorizer.fit_transform(X_train)
+            X_test_tfidf = self.vectorizer.transform(X_test)
+            columns, replay = list(df.columns.drop('symptoms_clean')), _replay_rows(X_train, y_train)
+            del df, X_train, X_test
         
         print("🌲 Training optimized model...")
         # Optimized Random Forest
-        self.model = RandomForestClassifier(
-            n_estimators=200,      # Increased from 150
-            max_depth=30,          # Increased from 25
-            min_samples_split=2,   # Reduced from 3 for better fit
-            min_samples_leaf=1,    # Reduced from 2
-            max_features='sqrt',   # Better feature selection
-            random_state=42,
-            n_jobs=-1,
-            class_weight='balanced',
-            bootstrap=True,
-            oob_score=True        # Out-of-bag score
-        )
+        self.model = RandomForestClassifier(**{**FOREST_PARAMS, **(forest_params or {})})
         self.model.fit(X_train_tfidf, y_train)
         
         # Evaluate
@@ -227,80 +557,737 @@ class HealthcareAI:
             print(f"📊 OOB Score: {self.model.oob_score_*100:.2f}%")
         print(f"{'='*60}\n")
         
+        self.fast_path = None
+        if distill:
+            self._distill(X_train_tfidf, X_test_tfidf)
+        self.calibrator = None
+        if calibrate:
+            self._calibrate(X_test_tfidf, y_test)
+        self.quantize = {**QUANTIZE_PARAMS, **(quantize if isinstance(quantize, dict) else {})} if quantize else None
+        
+        # Checkpoint for train_incremental: where the data ends, the document
+        # frequencies behind idf_, and a few rows per disease to replay
+        presence = np.bincount(X_train_tfidf.indices, minlength=X_train_tfidf.shape[1])
+        diseases, counts = np.unique(np.asarray(y_train), return_counts=True)
+        checkpoint = {
+            'version': 1,
+            'dataset_offset': os.path.getsize(dataset_path),
+            'columns': columns,
+            'n_documents': X_train_tfidf.shape[0],
+            'document_frequency': presence.tolist(),
+            'class_counts': {str(k): int(v) for k, v in zip(diseases, counts)},
+            'replay': replay,
+            'quantize': self.quantize,
+        }
+        
         # Save
-        joblib.dump(self.model, 'model_optimized.pkl')
-        joblib.dump(self.vectorizer, 'vectorizer_optimized.pkl')
-        print("💾 Model saved!")
+        self._save(checkpoint)
         
         return accuracy
     
+    def _distill(self, X_train_tfidf, X_test_tfidf):
+        print("⚡ Distilling fast-path model...")
+        # Out-of-bag probabilities are the forest's honest view of its own
+        # training rows; rows never left out fall back to predict_proba
+        soft_targets = getattr(self.model, 'oob_decision_function_', None)
+        if soft_targets is None:
+            soft_targets = self.model.predict_proba(X_train_tfidf)
+        else:
+            missing = np.isnan(soft_targets).any(axis=1)
+            soft_targets = np.array(soft_targets)
+            if missing.any():
+                soft_targets[missing] = self.model.predict_proba(X_train_tfidf[np.flatnonzero(missing)])
+        self.fast_path = DistilledModel.fit(X_train_tfidf, soft_targets, self.model.classes_)
+        
+        # The margin is tuned on half of the held-out split and reported on
+        # the other half, so the agreement figure is not scored on the rows
+        # that chose it
+        rows = np.random.default_rng(42).permutation(X_test_tfidf.shape[0])
+        tune_rows, report_rows = np.sort(rows[:len(rows) // 2]), np.sort(rows[len(rows) // 2:])
+        X_tune = X_test_tfidf[tune_rows]
+        forest_labels = self.model.predict_proba(X_tune).argmax(axis=1)
+        self.fast_path.choose_margin(self.fast_path.predict_proba(X_tune), forest_labels)
+        report = self.fast_path.evaluate(X_test_tfidf[report_rows], self.model)
+        print(f"⚡ Fast path: {report['hit_rate']*100:.1f}% of held-out cases not used for tuning clear margin {report['margin']:.3f}, "
+              f"{report['overall_agreement']*100:.2f}% agreement with the forest, "
+              f"{report['forest_ms']:.2f}ms → {report['two_tier_ms']:.2f}ms per case")
+    
+    def _calibrate(self, X_test_tfidf, y_test):
+        print("📐 Calibrating confidence...")
+        # Probabilities as predict() would see them, fast path included
+        probabilities = self.model.predict_proba(X_test_tfidf)
+        if self.fast_path is not None:
+            student = self.fast_path.predict_proba(X_test_tfidf)
+            confident = self.fast_path.confident(student)
+            probabilities[confident] = student[confident]
+        best = probabilities.argmax(axis=1)
+        correct = np.asarray(self.model.classes_).astype(str)[best] == np.asarray(y_test).astype(str)
+        self.calibrator = ConfidenceCalibrator.fit_report(probabilities[np.arange(len(best)), best], correct)
+        report = self.calibrator.report
+        print(f"📐 Calibration error on held-out cases: {report['ece_boosted']*100:.1f} points with the old boost, "
+              f"{report['ece_raw']*100:.1f} raw, {report['ece_calibrated']*100:.1f} calibrated "
+              f"({report['knots']} knots)")
+    
+    def train_incremental(self, dataset_path='dataset_improved.csv', new_trees=20, max_trees=None):
+        # Learn from rows appended since the last checkpoint: refresh the IDF
+        # weights over the fixed vocabulary and grow the forest with warm_start
+        import pandas as pd
+        
+        checkpoint = _load_checkpoint(self.bundle) if self.model is not None else None
+        if checkpoint is None:
+            print("⚠️ No checkpoint or loaded model, running a full training instead")
+            return self.train(dataset_path)
+        
+        start = time.perf_counter()
+        # Updated on private copies: requests keep reading the live model
+        # until _save() swaps the new one in
+        model, vectorizer = self._trainable_copies()
+        with open(dataset_path, 'rb') as f:
+            f.seek(checkpoint['dataset_offset'])
+            data = f.read()
+        if not data.strip():
+            print("✅ No new cases since the last checkpoint")
+            return None
+        delta = pd.read_csv(io.BytesIO(data), header=None, names=checkpoint['columns'])
+        delta['symptoms_clean'] = preprocess_series(delta['symptoms'])
+        print(f"✅ {len(delta)} new cases since model v{checkpoint['version']}")
+        
+        unseen = set(delta['disease']) - set(model.classes_)
+        if unseen:
+            # Existing trees cannot grow new output classes
+            print(f"⚠️ New diseases {sorted(unseen)}, running a full training instead")
+            return self.train(dataset_path)
+        
+        print("🔧 Updating document frequencies...")
+        presence = (vectorizer.transform(delta['symptoms_clean']) > 0).sum(axis=0).A1
+        document_frequency = np.asarray(checkpoint['document_frequency']) + presence
+        n_documents = checkpoint['n_documents'] + len(delta)
+        # Same smoothed formula TfidfVectorizer uses when fitting
+        vectorizer.idf_ = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+        
+        print(f"🌲 Adding {new_trees} trees...")
+        # Replayed rows keep every disease present so the class set stays fixed
+        replay = pd.DataFrame(checkpoint['replay'], columns=['symptoms_clean', 'disease'])
+        texts = pd.concat([delta['symptoms_clean'], replay['symptoms_clean']], ignore_index=True)
+        labels = pd.concat([delta['disease'], replay['disease']], ignore_index=True)
+        class_counts = checkpoint['class_counts']
+        for disease, count in delta['disease'].value_counts().items():
+            class_counts[disease] = class_counts.get(disease, 0) + int(count)
+        if model.class_weight is not None:
+            # "balanced" over the whole corpus seen so far, not just this delta
+            total = sum(class_counts.values())
+            class_weight = {d: total / (len(class_counts) * c) for d, c in class_counts.items()}
+            model.set_params(class_weight=class_weight)
+        model.set_params(warm_start=True, oob_score=False,
+                         n_estimators=len(model.estimators_) + new_trees)
+        model.fit(vectorizer.transform(texts), labels)
+        
+        if max_trees is not None and len(model.estimators_) > max_trees:
+            # Retire the oldest trees
+            model.estimators_ = model.estimators_[-max_trees:]
+            model.n_estimators = max_trees
+        
+        self.model, self.vectorizer = model, vectorizer
+        if self.fast_path is not None or self.calibrator is not None:
+            # The student mimics the old forest and the calibration table maps
+            # its probabilities; every idf_ weight just changed, so neither
+            # holds. A full train() distills and calibrates again
+            print("⚠️ Fast path and calibration dropped until the next full training")
+            self.fast_path = self.calibrator = None
+        self.quantize = checkpoint.get('quantize')
+        
+        checkpoint.update({
+            'version': checkpoint['version'] + 1,
+            'dataset_offset': checkpoint['dataset_offset'] + len(data),
+            'n_documents': n_documents,
+            'document_frequency': document_frequency.tolist(),
+            'replay': _replay_rows(texts, labels),
+        })
+        # Published in the same bundle as the model, so a crash never leaves
+        # one without the other
+        self._save(checkpoint)
+        
+        elapsed = time.perf_counter() - start
+        print(f"✅ Model v{checkpoint['version']}: {len(self.model.estimators_)} trees, updated in {elapsed:.1f}s")
+        return checkpoint['version']
+    
+    def _trainable_copies(self):
+        # sklearn model and vectorizer that train_incremental may modify.
+        # Array-backed models cannot grow trees, so their pickles are loaded
+        # instead: the bundle's if one is loaded, else loose pickles from
+        # before bundles
+        if hasattr(self.model, 'estimators_'):
+            return copy.deepcopy(self.model), copy.deepcopy(self.vectorizer)
+        import joblib
+        if self.bundle is not None:
+            paths = (os.path.join(self.bundle, 'model.pkl'), os.path.join(self.bundle, 'vectorizer.pkl'))
+        else:
+            paths = ('model_optimized.pkl', 'vectorizer_optimized.pkl')
+        if not all(os.path.exists(path) for path in paths):
+            raise ValueError(f"train_incremental needs the sklearn model behind the loaded arrays; "
+                             f"{' and '.join(paths)} not found. Run train() instead.")
+        return joblib.load(paths[0]), joblib.load(paths[1])
+    
+    def _save(self, checkpoint=None):
+        # Versioned bundle with hashes, published atomically: the model is
+        # written once, and its vectorizer, arrays, fast path, calibration and
+        # training checkpoint go with it, so no reader can pair files from
+        # different saves
+        self.bundle = write_bundle(lambda directory: self._write_bundle_files(directory, checkpoint), metadata={
+            'features': type(self.vectorizer).__name__,
+            'n_features': len(self.vectorizer.idf_),
+            'n_trees': _tree_count(self.model),
+            'classes': [str(c) for c in self.model.classes_],
+            'fast_path': self.fast_path is not None,
+            'calibrated': self.calibrator is not None,
+            'quantized': self.quantize,
+        })
+        # ARRAYS_DIR is switched to the bundle's arrays rather than a copy,
+        # never written over files a serving process may have memory-mapped
+        publish_link(os.path.join(self.bundle, 'arrays'), ARRAYS_DIR)
+        print(f"💾 Model saved! ({self.bundle})")
+        
+        self._model_swapped(self.bundle)
+    
+    def _export_arrays(self, directory):
+        export_arrays(self.model, self.vectorizer, directory, **(self.quantize or {}))
+        for artifact, filename in ((self.fast_path, FAST_PATH_FILE), (self.calibrator, CALIBRATION_FILE)):
+            if artifact is not None:
+                artifact.save(directory)
+            elif os.path.exists(os.path.join(directory, filename)):
+                os.remove(os.path.join(directory, filename))
+    
+    def _write_bundle_files(self, directory, checkpoint=None):
+        import joblib
+        joblib.dump(self.model, os.path.join(directory, 'model.pkl'))
+        joblib.dump(self.vectorizer, os.path.join(directory, 'vectorizer.pkl'))
+        self._export_arrays(os.path.join(directory, 'arrays'))
+        if checkpoint is not None:
+            atomic_write(os.path.join(directory, CHECKPOINT_FILE), json.dumps(checkpoint).encode('utf-8'))
+    
     def load(self):
+        # The published bundle's pickles. Loose pickles from before bundles
+        # load without a fast path or calibration, which could not be tied to
+        # the same save
+        if self.load_bundle(arrays=False):
+            return True
         if os.path.exists('model_optimized.pkl') and os.path.exists('vectorizer_optimized.pkl'):
+            import joblib
             self.model = joblib.load('model_optimized.pkl')
             self.vectorizer = joblib.load('vectorizer_optimized.pkl')
+            self.fast_path = self.calibrator = None
+            self._model_swapped()
             return True
         return False
     
+    @classmethod
+    def for_inference(cls, directory=ARRAYS_DIR, **kwargs):
+        # Inference-only start: the published bundle, then exported arrays
+        # (NumPy only), then pickles as the last fallback
+        ai = cls(**kwargs)
+        if ai.load_bundle() or ai.load_arrays(directory) or ai.load():
+            return ai
+        return None
+    
+    def load_bundle(self, bundle=None, root=BUNDLES_DIR, arrays=True, verify=True):
+        # A published bundle (CURRENT by default), hash-checked before use
+        live = self._read_bundle(bundle or current_bundle(root), arrays, verify)
+        if live is None:
+            return False
+        self._install(live)
+        return True
+    
+    def _read_bundle(self, bundle, arrays=True, verify=True):
+        if bundle is None:
+            return None
+        # Only the files this load opens are hashed: serving from arrays
+        # never reads the pickles, which are most of the bundle
+        side_files = {os.path.join('arrays', FAST_PATH_FILE), os.path.join('arrays', CALIBRATION_FILE)}
+        if arrays:
+            loaded = lambda name: os.path.dirname(name) == 'arrays'
+        else:
+            loaded = lambda name: name in side_files or name in ('model.pkl', 'vectorizer.pkl')
+        manifest = verify_bundle(bundle, loaded) if verify else read_manifest(bundle)
+        arrays_dir = os.path.join(bundle, 'arrays')
+        if arrays:
+            model, vectorizer = load_arrays(arrays_dir)
+        else:
+            import joblib
+            model = joblib.load(os.path.join(bundle, 'model.pkl'))
+            vectorizer = joblib.load(os.path.join(bundle, 'vectorizer.pkl'))
+        return LiveModel(model, vectorizer, DistilledModel.load(arrays_dir),
+                         PredictionCache(self.cache.maxsize), bundle, manifest['version'], bundle_id(bundle),
+                         ConfidenceCalibrator.load(arrays_dir))
+    
+    def refresh_bundle(self, root=BUNDLES_DIR, arrays=True):
+        # Loads a newly published bundle off the request path, then swaps it in
+        bundle = current_bundle(root)
+        if bundle is None or bundle == self._rejected_bundle or (self.live is not None and self.live.bundle == bundle):
+            return False
+        try:
+            live = self._read_bundle(bundle, arrays)
+        except (OSError, ValueError, KeyError) as exc:
+            # Not retried until another bundle is published
+            self._rejected_bundle = bundle
+            print(f"⚠️ Keeping the current model, {bundle} failed to load: {exc}")
+            return False
+        self._install(live)
+        print(f"🔁 Switched to model bundle v{live.version}")
+        return True
+    
+    def watch_bundles(self, root=BUNDLES_DIR, interval=5.0, arrays=True):
+        # Polls CURRENT from a daemon thread; requests keep using the model
+        # they started with and never wait for a load
+        if self._watcher is None:
+            self._watcher = threading.Event()
+            
+            def poll(stop=self._watcher):
+                while not stop.wait(interval):
+                    self.refresh_bundle(root, arrays)
+            
+            threading.Thread(target=poll, name='bundle-watcher', daemon=True).start()
+        return self._watcher
+    
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.set()
+            self._watcher = None
+    
+    def load_arrays(self, directory=ARRAYS_DIR):
+        # NumPy-only inference over memory-mapped arrays written by train();
+        # resolved once so every file comes from the same published version
+        directory = os.path.realpath(directory)
+        if os.path.exists(os.path.join(directory, 'meta.json')):
+            self.model, self.vectorizer = load_arrays(directory)
+            self.fast_path = DistilledModel.load(directory)
+            self.calibrator = ConfidenceCalibrator.load(directory)
+            self._model_swapped()
+            return True
+        return False
+    
+    def _model_swapped(self, bundle=None):
+        # Wraps the attributes set by train()/load() into a new LiveModel;
+        # cached results belong to the previous model, so it gets a fresh cache
+        self._install(LiveModel(self.model, self.vectorizer, self.fast_path,
+                                PredictionCache(self.cache.maxsize), bundle,
+                                model_id=bundle_id(bundle) if bundle else None, calibrator=self.calibrator))
+        return self.live
+    
+    def _install(self, live):
+        # The one assignment requests observe; the attributes below mirror it
+        # for callers that read them directly
+        self.live = live
+        self.model, self.vectorizer, self.fast_path = live.model, live.vectorizer, live.fast_path
+        self.calibrator = live.calibrator
+        self.cache, self.payloads, self._payloads_by_name = live.cache, live.payloads, live.payloads_by_name
+        self.bundle = live.bundle
+    
+    def _live(self):
+        return self.live or self._model_swapped()
+    
+    def _payload(self, index):
+        return self._live().payloads[index]
+    
+    def encode_result(self, result):
+        # Pre-encoded bytes for plain predictions, json.dumps for anything else
+        payload = self._payloads_by_name.get(result.get('disease'))
+        if payload is not None and len(result) == len(payload.template):
+            return payload.json_bytes(result['confidence'])
+        return json.dumps(result).encode('utf-8')
+    
     def predict(self, symptoms):
-        # Validate input
-        is_valid, message, symptom_count = validate_symptoms(symptoms)
+        # Stage timers cost a single flag check when metrics are off
+        live = self._live()
+        answer, symptoms_clean, t = self._screen(symptoms, time.perf_counter_ns() if self.metrics.enabled else None)
+        if answer is not None:
+            return answer
+        return self._predict_screened(live, symptoms_clean, t)
+    
+    def _predict_screened(self, live, symptoms_clean, t=None):
+        # Cache, then the model stages for a text that passed _screen;
+        # identical texts in flight at once share one model pass
+        metrics = self.metrics
+        timed = t is not None
+        key = cache_key(symptoms_clean)
+        cached = live.cache.get(key)
+        if timed:
+            t = metrics.lap('cache', t)
+        if cached is not None:
+            if timed:
+                metrics.count('cached')
+            return cached
+        
+        if self.flights is None:
+            return self._predict_clean(live, symptoms_clean, key, t)
+        # Keyed by model too, so a request never shares another model's answer
+        result, shared = self.flights.do((id(live), key), lambda: self._predict_clean(live, symptoms_clean, key, t))
+        if not shared:
+            return result
+        if timed:
+            metrics.count('coalesced')
+        # Own copy, as PredictionCache hands out, so callers cannot alias
+        return dict(result)
+    
+    def _screen(self, symptoms, t=None):
+        # Checks on the caller's own text, before anything is cached or
+        # shared: (answer, None, t) for an emergency or an invalid input, else
+        # (None, cleaned text, t). t is the stage clock when timing
+        metrics = self.metrics
+        timed = t is not None
+        spans = PHRASE_EXTRACTOR.extract(symptoms)
+        if timed:
+            t = metrics.lap('extract', t)
+        # An emergency phrase wins over validation, so a complaint too vague
+        # to diagnose still raises the alarm
+        if spans.emergencies:
+            if timed:
+                t = metrics.lap('screen', t)
+                metrics.count('emergency')
+            return _emergency_result(), None, t
+        is_valid, message, symptom_count = validate_spans(spans)
+        if timed:
+            t = metrics.lap('screen', t)
         if not is_valid:
-            return {
-                'is_emergency': False,
-                'is_valid': False,
-                'error': message
-            }
+            if timed:
+                metrics.count('invalid')
+            return _invalid_result(message), None, t
+        return None, spans.text, t
+    
+    def _predict_clean(self, live, symptoms_clean, key, t=None):
+        # Model stages for one cleaned text; t is the stage clock when timing
+        metrics = self.metrics
+        timed = t is not None
+        store = self.store if live.model_id is not None else None
+        if store is not None:
+            stored = store.get(live.model_id, key)
+            if timed:
+                t = metrics.lap('store', t)
+            result = live.stored_result(stored) if stored else None
+            if result is not None:
+                live.cache.put(key, result)
+                if timed:
+                    metrics.count('stored')
+                return result
         
-        # Check emergency
-        if is_emergency(symptoms):
-            return {
-                'is_emergency': True,
-                'is_valid': True,
-                'message': '⚠️⚠️ CRITICAL CONDITION – SEEK IMMEDIATE MEDICAL ATTENTION ⚠️⚠️'
-            }
+        symptoms_tfidf = live.vectorizer.transform([symptoms_clean])
+        if timed:
+            t = metrics.lap('transform', t)
         
-        # Preprocess and predict
-        symptoms_clean = preprocess_text(symptoms)
-        symptoms_tfidf = self.vectorizer.transform([symptoms_clean])
+        # Confident cases stop at the distilled model
+        probabilities = None
+        fast_path = live.fast_path
+        if fast_path is not None:
+            student = fast_path.predict_proba(symptoms_tfidf)
+            if fast_path.confident(student)[0]:
+                probabilities = student[0]
+            if timed:
+                t = metrics.lap('fast_path', t)
         
-        # Get prediction
-        disease = self.model.predict(symptoms_tfidf)[0]
-        probabilities = self.model.predict_proba(symptoms_tfidf)[0]
+        # Get prediction: one forest pass, argmax gives the label
+        if probabilities is None:
+            probabilities = live.model.predict_proba(symptoms_tfidf)[0]
+            if timed:
+                t = metrics.lap('predict_proba', t)
+        elif timed:
+            metrics.count('fast_path')
+        best = probabilities.argmax()
         
-        # Calculate confidence (optimized to show higher values)
-        max_prob = max(probabilities)
+        result = live.payloads[best].result(live.confidence(probabilities[best]))
+        live.cache.put(key, result)
+        if store is not None:
+            store.put(live.model_id, key, result['disease'], result['confidence'])
+        if timed:
+            metrics.lap('payload', t)
+            metrics.count('predicted')
+        return result
+    
+    async def predict_async(self, symptoms, executor=None):
+        # predict() for asyncio callers. Each caller's own text is screened
+        # here first, so an emergency or an invalid input is never answered
+        # with another caller's result. Only the model stage is shared:
+        # identical screened texts awaiting on the same event loop share one
+        # executor job, and that job still coalesces with threads calling
+        # predict() directly
+        import asyncio
+        live = self._live()
+        timed = self.metrics.enabled
+        answer, symptoms_clean, _ = self._screen(symptoms, time.perf_counter_ns() if timed else None)
+        if answer is not None:
+            return answer
+        loop = asyncio.get_running_loop()
+        key = (id(loop), id(live), cache_key(symptoms_clean))
+        future = self._async_flights.get(key)
+        if future is not None:
+            if self.flights is not None:
+                self.flights.count_coalesced()
+            if timed:
+                self.metrics.count('coalesced')
+            return dict(await asyncio.shield(future))
         
-        # Boost confidence score for display
-        # If model is confident, show even higher confidence
-        if max_prob > 0.5:
-            confidence = min(max_prob * 1.3, 1.0) * 100  # Boost by 30%
-        elif max_prob > 0.3:
-            confidence = min(max_prob * 1.2, 1.0) * 100  # Boost by 20%
-        else:
-            confidence = max_prob * 100
+        def job():
+            return self._predict_screened(live, symptoms_clean, time.perf_counter_ns() if timed else None)
         
-        # Get disease info
-        info = DISEASE_INFO.get(disease, {
-            "description": "Please consult a doctor for proper diagnosis.",
-            "severity": "Moderate",
-            "home_remedies": ["Rest", "Stay hydrated"],
-            "natural_remedies": ["Healthy diet", "Adequate sleep"],
-            "otc_medicines": ["Consult pharmacist"],
-            "prevention": ["Healthy lifestyle"]
-        })
+        future = loop.run_in_executor(executor, job)
+        if self.flights is not None:
+            self._async_flights[key] = future
+        try:
+            # shield: a cancelled caller must not cancel the others' result
+            return await asyncio.shield(future)
+        finally:
+            if self._async_flights.get(key) is future:
+                del self._async_flights[key]
+    
+    def predict_batch(self, symptoms_list):
+        # Screening stages are timed per item, model stages once per batch
+        live = self._live()
+        metrics = self.metrics
+        timed = metrics.enabled
+        if timed:
+            t = time.perf_counter_ns()
+        
+        # Screen every item first; emergency and invalid rows are answered in place
+        results = [None] * len(symptoms_list)
+        pending_rows, pending_texts, pending_keys = [], [], []
+        for i, symptoms in enumerate(symptoms_list):
+            results[i], symptoms_clean, t = self._screen(symptoms, t if timed else None)
+            if results[i] is not None:
+                continue
+            key = cache_key(symptoms_clean)
+            results[i] = live.cache.get(key)
+            if timed:
+                t = metrics.lap('cache', t)
+            if results[i] is None:
+                pending_rows.append(i)
+                pending_texts.append(symptoms_clean)
+                pending_keys.append(key)
+            elif timed:
+                metrics.count('cached')
+        
+        duplicates = []
+        if self.flights is not None and len(set(pending_keys)) < len(pending_keys):
+            # Repeats within the batch are scored once and copied afterwards
+            first_row = {}
+            unique = []
+            for i, text, key in zip(pending_rows, pending_texts, pending_keys):
+                if key in first_row:
+                    duplicates.append((i, first_row[key]))
+                else:
+                    first_row[key] = i
+                    unique.append((i, text, key))
+            pending_rows, pending_texts, pending_keys = (list(column) for column in zip(*unique))
+            self.flights.count_coalesced(len(duplicates))
+            if timed:
+                metrics.count('coalesced', len(duplicates))
         
-        return {
+        store = self.store if live.model_id is not None and pending_rows else None
+        if store is not None:
+            stored = store.get_many(live.model_id, pending_keys)
+            remaining = []
+            for i, text, key in zip(pending_rows, pending_texts, pending_keys):
+                result = live.stored_result(stored[key]) if key in stored else None
+                if result is None:
+                    remaining.append((i, text, key))
+                    continue
+                results[i] = result
+                live.cache.put(key, result)
+            if timed:
+                t = metrics.lap('store', t)
+                metrics.count('stored', len(pending_rows) - len(remaining))
+            pending_rows, pending_texts, pending_keys = (
+                (list(column) for column in zip(*remaining)) if remaining else ([], [], []))
+        
+        if pending_rows:
+            # One sparse matrix and a single forest pass for the whole batch
+            symptoms_tfidf = live.vectorizer.transform(pending_texts)
+            if timed:
+                t = metrics.lap('transform', t)
+            fast_path = live.fast_path
+            if fast_path is None:
+                probabilities = live.model.predict_proba(symptoms_tfidf)
+            else:
+                # Forest only for the rows the distilled model is unsure about
+                probabilities = fast_path.predict_proba(symptoms_tfidf)
+                unsure = np.flatnonzero(~fast_path.confident(probabilities))
+                if timed:
+                    t = metrics.lap('fast_path', t)
+                    metrics.count('fast_path', len(pending_rows) - len(unsure))
+                if len(unsure):
+                    probabilities[unsure] = live.model.predict_proba(symptoms_tfidf[unsure])
+            best = probabilities.argmax(axis=1)
+            # Calibrated for the whole batch in one vectorized lookup
+            confidences = live.confidence(probabilities[np.arange(len(best)), best])
+            if timed:
+                t = metrics.lap('predict_proba', t)
+            for i, key, index, confidence in zip(pending_rows, pending_keys, best, confidences):
+                results[i] = live.payloads[index].result(confidence)
+                live.cache.put(key, results[i])
+            if store is not None:
+                store.put_many(live.model_id, [(key, results[i]['disease'], results[i]['confidence'])
+                                               for i, key in zip(pending_rows, pending_keys)])
+            if timed:
+                metrics.lap('payload', t)
+                metrics.count('predicted', len(pending_rows))
+        for i, source in duplicates:
+            results[i] = dict(results[source])
+        
+        return results
+    
+    def predict_top_k(self, symptoms, k=3, early_exit=False, chunk_size=10):
+        # Ranked differential from a single probability pass; with early_exit
+        # trees are added in chunks until the leader can no longer be overtaken,
+        # and 'partial' marks probabilities taken from only part of the forest
+        _check_k(k)
+        answer, symptoms_clean, _ = self._screen(symptoms)
+        if answer is not None:
+            return answer
+        
+        live = self._live()
+        symptoms_tfidf = live.vectorizer.transform([symptoms_clean])
+        if early_exit:
+            probabilities, trees_evaluated = _early_exit_proba(live.model, symptoms_tfidf, chunk_size)
+        else:
+            probabilities = live.model.predict_proba(symptoms_tfidf)[0]
+            trees_evaluated = _tree_count(live.model)
+        
+        top = top_k_indices(probabilities, k)
+        result = live.payloads[top[0]].result(live.confidence(probabilities[top[0]]))
+        differential = [
+            {'disease': live.payloads[i].disease, 'probability': round(float(probabilities[i]) * 100, 1)}
+            for i in top
+        ]
+        # Diseases no tree voted for are not part of the differential
+        result['differential'] = [entry for entry in differential if entry['probability'] > 0]
+        result['trees_evaluated'] = trees_evaluated
+        result['partial'] = trees_evaluated < _tree_count(live.model)
+        return result
+
+def _check_k(k):
+    if isinstance(k, bool) or not isinstance(k, (int, np.integer)) or k < 1:
+        raise ValueError(f"k must be a positive integer, got {k!r}")
+
+def top_k_indices(probabilities, k):
+    # argpartition finds the k best in O(n); only those k get sorted
+    _check_k(k)
+    k = min(k, len(probabilities))
+    top = np.argpartition(-probabilities, k - 1)[:k]
+    return top[np.argsort(-probabilities[top], kind='stable')]
+
+def _tree_count(model):
+    return len(model.estimators_) if hasattr(model, 'estimators_') else len(model.roots)
+
+def _accumulate_trees(model, X, chunk_size):
+    # Yields (trees so far, summed class probabilities of the first row)
+    X = X.astype(np.float32)
+    estimators = model.estimators_
+    totals = np.zeros(len(model.classes_))
+    for start in range(0, len(estimators), chunk_size):
+        for estimator in estimators[start:start + chunk_size]:
+            totals += estimator.predict_proba(X, check_input=False)[0]
+        yield min(start + chunk_size, len(estimators)), totals
+
+def _early_exit_proba(model, X, chunk_size):
+    # Each tree adds at most 1 to any class, so once the leader is ahead of
+    # the runner-up by more than the trees left, the argmax is settled
+    n_trees = _tree_count(model)
+    if not hasattr(model, 'estimators_'):
+        # ArrayForest walks all trees level by level in one vectorized pass;
+        # re-walking every level per chunk costs more than the trees it skips
+        return model.predict_proba(X)[0], n_trees
+    for trees, totals in _accumulate_trees(model, X, chunk_size):
+        runner_up, leader = np.partition(totals, -2)[-2:] if len(totals) > 1 else (0.0, totals[0])
+        if leader - runner_up > n_trees - trees:
+            break
+    return totals / trees, trees
+
+def _invalid_result(message):
+    return {
+        'is_emergency': False,
+        'is_valid': False,
+        'error': message
+    }
+
+def _emergency_result():
+    return {
+        'is_emergency': True,
+        'is_valid': True,
+        'message': '⚠️⚠️ CRITICAL CONDITION – SEEK IMMEDIATE MEDICAL ATTENTION ⚠️⚠️'
+    }
+
+# Disease info used when a predicted disease has no DISEASE_INFO entry
+DEFAULT_DISEASE_INFO = {
+    "description": "Please consult a doctor for proper diagnosis.",
+    "severity": "Moderate",
+    "home_remedies": ["Rest", "Stay hydrated"],
+    "natural_remedies": ["Healthy diet", "Adequate sleep"],
+    "otc_medicines": ["Consult pharmacist"],
+    "prevention": ["Healthy lifestyle"]
+}
+
+class DiseasePayload:
+    # Response for one disease, built once per loaded model: an immutable
+    # template plus its JSON encoding split around the confidence value
+    __slots__ = ('disease', 'template', '_json_head', '_json_tail')
+    
+    def __init__(self, disease):
+        info = DISEASE_INFO.get(disease, DEFAULT_DISEASE_INFO)
+        disease = str(disease)
+        self.disease = disease
+        self.template = MappingProxyType({
             'is_emergency': False,
             'is_valid': True,
             'disease': disease,
-            'confidence': round(confidence, 1),  # Round to 1 decimal
+            'confidence': None,
             'severity': info['severity'],
             'description': info['description'],
-            'home_remedies': info['home_remedies'],
-            'natural_remedies': info['natural_remedies'],
-            'otc_medicines': info['otc_medicines'],
-            'prevention': info['prevention']
-        }
+            'home_remedies': tuple(info['home_remedies']),
+            'natural_remedies': tuple(info['natural_remedies']),
+            'otc_medicines': tuple(info['otc_medicines']),
+            'prevention': tuple(info['prevention'])
+        })
+        head = {key: self.template[key] for key in ('is_emergency', 'is_valid', 'disease')}
+        tail = {key: value for key, value in self.template.items() if key not in head and key != 'confidence'}
+        self._json_head = (json.dumps(head)[:-1] + ', "confidence": ').encode('utf-8')
+        self._json_tail = (', ' + json.dumps(tail)[1:]).encode('utf-8')
+    
+    def result(self, confidence):
+        result = self.template.copy()
+        result['confidence'] = confidence
+        return result
+    
+    def json_bytes(self, confidence):
+        return self._json_head + repr(float(confidence)).encode('ascii') + self._json_tail
+
+class LiveModel:
+    # One loaded model with everything derived from it. HealthcareAI swaps
+    # these by reassigning a single attribute, and each request reads that
+    # attribute once, so it never mixes one model's vectorizer with another's
+    # forest and an in-flight request finishes on the model it started with
+    __slots__ = ('model', 'vectorizer', 'fast_path', 'cache', 'payloads', 'payloads_by_name',
+                 'bundle', 'version', 'model_id', 'calibrator', 'confidence')
+    
+    def __init__(self, model, vectorizer, fast_path, cache, bundle=None, version=None, model_id=None,
+                 calibrator=None):
+        if fast_path is not None and list(fast_path.classes_) != [str(c) for c in model.classes_]:
+            # Left over from another model
+            fast_path = None
+        self.model = model
+        self.vectorizer = vectorizer
+        self.fast_path = fast_path
+        self.cache = cache
+        self.payloads = [DiseasePayload(disease) for disease in model.classes_]
+        self.payloads_by_name = {payload.disease: payload for payload in self.payloads}
+        self.bundle = bundle
+        self.version = version
+        # Result store key; only bundles have one that is stable across processes
+        self.model_id = model_id
+        self.calibrator = calibrator
+        # Top-1 probability (scalar or array) to the reported percentage
+        self.confidence = (calibrator or UNCALIBRATED).confidence
+    
+    def stored_result(self, stored):
+        # (disease, confidence) from the result store back into a full result
+        payload = self.payloads_by_name.get(stored[0])
+        return payload.result(stored[1]) if payload is not None else None
 
 # Main execution
 if __name__ == "__main__":
@@ -77,13 +77,16 @@ st.markdown("""
 @st.cache_resource
 def load_ai():
     ai = HealthcareAI()
-    if not ai.load():
+    # Published bundle first, then exported arrays (no sklearn unpickling), then pickles
+    if not (ai.load_bundle() or ai.load_arrays() or ai.load()):
         if os.path.exists('dataset_improved.csv'):
             with st.spinner("🔄 Training optimized model for HIGH CONFIDENCE... Please wait 2-3 minutes..."):
                 ai.train()
         else:
             st.error("❌ dataset_improved.csv not found!")
             return None
+    # Retrained bundles are swapped in behind the cached instance, no restart needed
+    ai.watch_bundles()
     return ai
 
 ai = load_ai()
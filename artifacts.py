@@ -0,0 +1,189 @@
+"""
+Healthcare AI - Versioned Model Bundles
+Each training run is written as one directory (model_bundles/v0007) holding
+the pickles, the exported arrays and a manifest of SHA-256 hashes. The
+bundle is assembled under a temporary name and renamed into place, then the
+CURRENT pointer is replaced, so a reader only ever sees a complete bundle
+whose model and vectorizer belong together.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+
+BUNDLES_DIR = 'model_bundles'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+# Size and mtime of bundle files already hashed, written beside the manifest
+VERIFIED_FILE = '.verified'
+
+# Bundles kept on disk after a new one is published
+KEEP_BUNDLES = 5
+
+_BUNDLE_NAME = re.compile(r'^v(\d+)$')
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fsync_dir(path):
+    # Makes a rename durable; not every platform can open a directory
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data):
+    # Readers see the old bytes or the new ones, never a partial file
+    tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def bundle_versions(root=BUNDLES_DIR):
+    if not os.path.isdir(root):
+        return []
+    return sorted(int(match.group(1)) for match in map(_BUNDLE_NAME.match, os.listdir(root)) if match)
+
+
+def write_bundle(write_files, root=BUNDLES_DIR, metadata=None, keep=KEEP_BUNDLES):
+    # write_files(directory) fills a scratch directory; the bundle is hashed,
+    # renamed into place and only then published through CURRENT
+    os.makedirs(root, exist_ok=True)
+    scratch = os.path.join(root, f'.tmp-{uuid.uuid4().hex}')
+    os.makedirs(scratch)
+    try:
+        write_files(scratch)
+        files = {}
+        for directory, _, names in os.walk(scratch):
+            for name in sorted(names):
+                path = os.path.join(directory, name)
+                files[os.path.relpath(path, scratch)] = {
+                    'sha256': file_sha256(path),
+                    'bytes': os.path.getsize(path),
+                }
+        versions = bundle_versions(root)
+        version = versions[-1] + 1 if versions else 1
+        manifest = {
+            'version': version,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'files': files,
+            **(metadata or {}),
+        }
+        atomic_write(os.path.join(scratch, MANIFEST_FILE), json.dumps(manifest, indent=2).encode('utf-8'))
+        name = f'v{version:04d}'
+        os.rename(scratch, os.path.join(root, name))
+    except BaseException:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+    _fsync_dir(root)
+    atomic_write(os.path.join(root, CURRENT_FILE), name.encode('utf-8'))
+
+    # Processes still serving an older bundle keep their open files and maps
+    for old in bundle_versions(root)[:-keep] if keep else []:
+        shutil.rmtree(os.path.join(root, f'v{old:04d}'), ignore_errors=True)
+    return os.path.join(root, name)
+
+
+def _published_versions(parent, base):
+    pattern = re.compile(rf'^\.{re.escape(base)}\.(\d+)$')
+    return sorted(int(match.group(1)) for match in map(pattern.match, os.listdir(parent)) if match)
+
+
+def publish_link(target, path):
+    # path becomes a symlink to target, switched in one rename. Files are
+    # never rewritten in place, so a process that memory-mapped the previous
+    # target keeps reading it intact, and a reader that resolves path once
+    # gets one version throughout
+    parent = os.path.dirname(os.path.abspath(path))
+    base = os.path.basename(os.path.normpath(path))
+    if os.path.isdir(path) and not os.path.islink(path):
+        # Plain directory from before versioned publishing, moved aside once
+        os.rename(path, os.path.join(parent, f'.{base}.0'))
+    link = os.path.join(parent, f'.{base}.{uuid.uuid4().hex}.link')
+    os.symlink(os.path.relpath(os.path.abspath(target), parent), link)
+    os.replace(link, path)
+    _fsync_dir(parent)
+
+    # Copies earlier layouts kept beside path; open maps of them stay valid
+    for old in _published_versions(parent, base):
+        shutil.rmtree(os.path.join(parent, f'.{base}.{old}'), ignore_errors=True)
+
+
+def current_bundle(root=BUNDLES_DIR):
+    # Path of the published bundle, or None before the first one
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(root, name)
+    return path if os.path.exists(os.path.join(path, MANIFEST_FILE)) else None
+
+
+def read_manifest(bundle):
+    with open(os.path.join(bundle, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def bundle_id(bundle):
+    # Names a bundle's exact contents, the same in every process that loads it
+    with open(os.path.join(bundle, MANIFEST_FILE), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def _read_verified(bundle):
+    try:
+        with open(os.path.join(bundle, VERIFIED_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def verify_bundle(bundle, include=None):
+    # Raises ValueError naming the first file that is missing or altered;
+    # include(name) limits the check to the files a reader will open.
+    # A file is hashed once: its size and mtime are then recorded in
+    # VERIFIED_FILE, and later loads that find both unchanged skip it
+    manifest = read_manifest(bundle)
+    verified = _read_verified(bundle)
+    newly_verified = {}
+    for name, expected in manifest['files'].items():
+        if include is not None and not include(name):
+            continue
+        path = os.path.join(bundle, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise ValueError(f"Bundle {bundle} is missing {name}")
+        signature = [stat.st_size, stat.st_mtime_ns]
+        if verified.get(name) == signature:
+            continue
+        if stat.st_size != expected['bytes'] or file_sha256(path) != expected['sha256']:
+            raise ValueError(f"Bundle {bundle} has a corrupted {name} (SHA-256 mismatch)")
+        newly_verified[name] = signature
+    if newly_verified:
+        try:
+            atomic_write(os.path.join(bundle, VERIFIED_FILE),
+                         json.dumps({**verified, **newly_verified}).encode('utf-8'))
+        except OSError:
+            # Read-only bundle: verified again on the next load
+            pass
+    return manifest
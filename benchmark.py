@@ -0,0 +1,908 @@
+"""
+Healthcare AI - Performance Benchmarks
+Run: python benchmark.py [name ...]
+     python benchmark.py suite --output bench.json --compare baseline.json
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing as mp
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from Backend import (
+    DISEASE_INFO, EMERGENCY_KEYWORDS, PHRASE_EXTRACTOR, VALID_SYMPTOMS, PhraseExtractor,
+    build_keyword_pattern, cache_key, preprocess_series, preprocess_text, validate_spans, validate_symptoms,
+)
+
+# Words the original validation counted a second time wherever they appeared
+COMMON_SYMPTOM_WORDS = ('pain', 'ache', 'fever', 'cough', 'headache', 'sore', 'burning', 'swelling', 'itching')
+
+
+def _time_per_call(fn, texts, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (repeats * len(texts)) * 1e6
+
+
+def _synthetic_phrases(count, rng):
+    # Multi-word red-flag phrases over a fixed pseudo-word vocabulary, the
+    # way a real multilingual list reuses words across many phrases
+    alphabet = 'abcdefghijklmnopqrstuvwxyz'
+    vocabulary = [''.join(rng.choices(alphabet, k=rng.randint(4, 9))) for _ in range(400)]
+    phrases = list(EMERGENCY_KEYWORDS)
+    while len(phrases) < count:
+        phrases.append(' '.join(rng.sample(vocabulary, rng.randint(2, 3))))
+    return phrases
+
+
+def bench_emergency(repeats=100):
+    rng = random.Random(42)
+    symptoms = sorted(VALID_SYMPTOMS)
+    texts = [', '.join(rng.sample(symptoms, 5)) for _ in range(50)]
+    texts += [t + ', chest pain' for t in texts[:10]]
+
+    print(f"\n{'='*60}")
+    print("🚨 Emergency keyword matching (µs per call)")
+    print(f"{'='*60}")
+    print(f"{'keywords':>10} {'linear scan':>14} {'compiled':>12} {'extractor':>10}")
+    for scale in (1, 10, 100, 1000):
+        keywords = _synthetic_phrases(len(EMERGENCY_KEYWORDS) * scale, rng)
+        pattern = build_keyword_pattern(keywords)
+        extractor = PhraseExtractor(symptoms=(), emergencies=keywords)
+
+        def linear(text):
+            text_lower = text.lower()
+            return any(keyword in text_lower for keyword in keywords)
+
+        def compiled(text):
+            return pattern.search(text.lower()) is not None
+
+        linear_us = _time_per_call(linear, texts, max(1, repeats // scale))
+        compiled_us = _time_per_call(compiled, texts, repeats)
+        extractor_us = _time_per_call(lambda text: extractor.extract(text).emergencies, texts, repeats)
+        print(f"{len(keywords):>10} {linear_us:>14.2f} {compiled_us:>12.2f} {extractor_us:>10.2f}")
+
+
+def _validate_symptoms_reference(symptoms_text, vocabulary):
+    # The original nested-loop validate_symptoms, kept for parity checks
+    symptoms_text = symptoms_text.lower().strip()
+    if len(symptoms_text) < 5:
+        return False, 0
+    symptoms_list = [s.strip() for s in symptoms_text.replace(',', ' ').replace(';', ' ').split()]
+    symptoms_list = [s for s in symptoms_list if len(s) > 2]
+    medical_word_count = 0
+    for symptom in symptoms_list:
+        for valid_symptom in vocabulary:
+            if symptom in valid_symptom or valid_symptom in symptom:
+                medical_word_count += 1
+                break
+    for word in COMMON_SYMPTOM_WORDS:
+        if word in symptoms_text:
+            medical_word_count += 1
+    if medical_word_count < 2:
+        return False, 0
+    if len(symptoms_list) < 2:
+        return False, len(symptoms_list)
+    return True, len(symptoms_list)
+
+
+# Distinct words whose validation answer is remembered per index
+MATCH_MEMO_SIZE = 100_000
+
+
+class SymptomIndex:
+    # The indexed bag-of-tokens validation the phrase extractor replaced, kept
+    # as the separate-scans reference. Answers "is this token inside a known
+    # term, or a known term inside this token" from hash lookups
+    def __init__(self, vocabulary):
+        self.terms = sorted({term.lower() for term in vocabulary if term})
+        self.term_set = set(self.terms)
+        # Input tokens never contain spaces, so only single-word terms can sit inside one
+        self.words = {term for term in self.terms if ' ' not in term}
+        self.word_lengths = sorted({len(word) for word in self.words})
+        # Trigram -> term ids, for tokens that are part of a longer term
+        self.trigrams = defaultdict(set)
+        for term_id, term in enumerate(self.terms):
+            for i in range(len(term) - 2):
+                self.trigrams[term[i:i + 3]].add(term_id)
+        # Answers for words already seen; patients reuse a small vocabulary
+        self._known = {}
+
+    def matches(self, token):
+        known = self._known.get(token)
+        if known is None:
+            known = self._matches(token)
+            if len(self._known) < MATCH_MEMO_SIZE:
+                self._known[token] = known
+        return known
+
+    def _matches(self, token):
+        if token in self.term_set:
+            return True
+    
+        # Token inside a known term: intersect trigram postings, then verify
+        if len(token) < 3:
+            return any(token in term for term in self.terms) or self._contains_word(token)
+        postings = []
+        for i in range(len(token) - 2):
+            posting = self.trigrams.get(token[i:i + 3])
+            if not posting:
+                return self._contains_word(token)
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = candidates & posting
+            if not candidates:
+                return self._contains_word(token)
+        return (any(token in self.terms[term_id] for term_id in candidates)
+                or self._contains_word(token))
+
+    def _contains_word(self, token):
+        # Known word inside the token: probe every slice of a length we index
+        for length in self.word_lengths:
+            if length > len(token):
+                break
+            for i in range(len(token) - length + 1):
+                if token[i:i + length] in self.words:
+                    return True
+        return False
+
+
+def _synthetic_vocabulary(count, rng):
+    # SNOMED-sized synonym list: real terms plus multi-word pseudo terms
+    alphabet = 'abcdefghijklmnopqrstuvwxyz'
+    vocabulary = set(VALID_SYMPTOMS)
+    while len(vocabulary) < count:
+        words = [''.join(rng.choices(alphabet, k=rng.randint(3, 10)))
+                 for _ in range(rng.randint(1, 3))]
+        vocabulary.add(' '.join(words))
+    return vocabulary
+
+
+def _symptom_texts(count, rng):
+    # Mix of real symptoms, fragments, typos and filler words
+    symptoms = sorted(VALID_SYMPTOMS)
+    filler = ['and', 'have', 'since', 'yesterday', 'feel', 'very', 'bad', 'xyz', 'qwerty', 'the']
+    texts = []
+    for _ in range(count):
+        words = rng.sample(symptoms, rng.randint(0, 4)) + rng.sample(filler, rng.randint(0, 4))
+        words = [w[:rng.randint(2, len(w))] if rng.random() < 0.2 else w for w in words]
+        rng.shuffle(words)
+        texts.append(rng.choice([', ', ' ', '; ']).join(words))
+    return texts
+
+
+def bench_validate(repeats=3):
+    rng = random.Random(42)
+    texts = _symptom_texts(2000, rng)
+    # Span counting is meant to decide differently from word counting:
+    # fragments and filler no longer count, a multi-word symptom counts once
+    rejected = [t for t in texts if _validate_symptoms_reference(t, VALID_SYMPTOMS)[0] and not validate_symptoms(t)[0]]
+    accepted = [t for t in texts if validate_symptoms(t)[0] and not _validate_symptoms_reference(t, VALID_SYMPTOMS)[0]]
+
+    print(f"\n{'='*60}")
+    print("✅ Symptom validation (µs per call)")
+    print(f"{'='*60}")
+    print(f"{'vocabulary':>10} {'nested loops':>14} {'spans':>12}")
+    sample = texts[:200]
+    for size in (len(VALID_SYMPTOMS), 5000, 50000):
+        vocabulary = _synthetic_vocabulary(size, rng)
+        extractor = PhraseExtractor(vocabulary)
+        nested_us = _time_per_call(lambda t: _validate_symptoms_reference(t, vocabulary), sample[:max(5, 10000 // size)], 1)
+        spans_us = _time_per_call(lambda t: validate_symptoms(t, extractor), sample, repeats)
+        print(f"{len(vocabulary):>10} {nested_us:>14.2f} {spans_us:>12.2f}")
+    print(f"🔀 of {len(texts)} texts, word counting accepted {len(rejected)} that spans reject "
+          f"and rejected {len(accepted)} that spans accept")
+    for text in rejected[:2] + accepted[:2]:
+        print(f"   {text!r}: {validate_symptoms(text)[1]}")
+
+
+def _screen_reference(text, index, emergency_pattern):
+    # The pre-extractor request path: validation, emergency regex and
+    # preprocess_text each scanned the text on their own
+    lowered = text.lower().strip()
+    if len(lowered) < 5:
+        return False, False, None
+    tokens = [s for s in lowered.replace(',', ' ').replace(';', ' ').split() if len(s) > 2]
+    count = sum(1 for token in tokens if index.matches(token))
+    count += sum(1 for word in COMMON_SYMPTOM_WORDS if word in lowered)
+    is_valid = count >= 2 and len(tokens) >= 2
+    emergency = emergency_pattern.search(text.lower()) is not None
+    return is_valid, emergency, preprocess_text(text)
+
+
+def _inflect(phrase, rng):
+    # Emergency phrase as a patient might type it, compounds included
+    prefix = rng.choice(['', '', '', 'heat', 'sun', 'mini', 'non'])
+    suffix = rng.choice(['', '', 's', 'ness', 'ing'])
+    return prefix + rng.choice([phrase, phrase.title(), phrase.replace(' ', '-')]) + suffix
+
+
+# Compounds the substring screen always caught, and phrases that only appear
+# when words from different listed complaints are read together
+_SCREEN_CASES_FLAGGED = ('heatstroke and fever', 'sunstroke, dizziness, headache',
+                         'had a ministroke yesterday, headache', 'non-stop seizures, fever')
+_SCREEN_CASES_CLEAR = ('pain in left arm, weakness, fatigue', 'tightness in chest, pain in legs, fever',
+                       'headache. Passing; out of breath', 'sore chest! pain in back')
+
+
+def bench_extract(count=5000, repeats=3):
+    rng = random.Random(11)
+    texts = _symptom_texts(count, rng)
+    for i in range(0, count, 10):
+        texts[i] = f"{texts[i]}, {_inflect(rng.choice(EMERGENCY_KEYWORDS), rng)}"
+    index = SymptomIndex(VALID_SYMPTOMS)
+    emergency_pattern = build_keyword_pattern(EMERGENCY_KEYWORDS)
+
+    def single_pass(text):
+        spans = PHRASE_EXTRACTOR.extract(text)
+        return validate_spans(spans)[0], bool(spans.emergencies), spans.text
+
+    # The extractor must flag every emergency the old substring regex did and
+    # produce the same features; what it adds is listed
+    missed, added = [], []
+    for text in texts:
+        old, new = _screen_reference(text, index, emergency_pattern), single_pass(text)
+        assert old[2] is None or cache_key(old[2]) == cache_key(new[2]), text
+        if old[1] and not new[1]:
+            missed.append(text)
+        elif new[1] and not old[1]:
+            added.append(text)
+    assert not missed, missed[:5]
+    for text in _SCREEN_CASES_FLAGGED:
+        assert PHRASE_EXTRACTOR.extract(text).emergencies, text
+    for text in _SCREEN_CASES_CLEAR:
+        assert not PHRASE_EXTRACTOR.extract(text).emergencies, text
+
+    print(f"\n{'='*60}")
+    print("🔎 Request screening: separate scans vs one phrase extraction (µs per call)")
+    print(f"{'='*60}")
+    separate_us = _time_per_call(lambda t: _screen_reference(t, index, emergency_pattern), texts, repeats)
+    single_us = _time_per_call(single_pass, texts, repeats)
+    print(f"{'separate scans':>24} {separate_us:>8.2f}")
+    print(f"{'single extraction':>24} {single_us:>8.2f} {separate_us / single_us:>6.1f}x")
+    print(f"🚨 emergencies only the extractor flags: {len(added)}, only the old regex flagged: {len(missed)}")
+    print(f"✅ same features; {len(_SCREEN_CASES_FLAGGED)} compound and "
+          f"{len(_SCREEN_CASES_CLEAR)} cross-punctuation cases screened as expected")
+    for text in added[:2]:
+        print(f"   {text!r}")
+
+
+def _preprocess_text_reference(text):
+    # The original character-by-character preprocess_text
+    text = text.lower()
+    text = ''.join(c if c.isalnum() or c.isspace() or c == ',' else ' ' for c in text)
+    return ' '.join(text.split())
+
+
+def bench_preprocess(rows=1_000_000):
+    import pandas as pd
+
+    rng = random.Random(42)
+    base = _symptom_texts(1000, rng)
+    noise = ['!!', ' (since monday)', ' - 3 days', '...', ' & chills', ' / worse at night', '']
+    column = pd.Series([rng.choice(base).title() + rng.choice(noise) for _ in range(rows)])
+
+    timings = {}
+    start = time.perf_counter()
+    expected = column.apply(_preprocess_text_reference)
+    timings['generator (original)'] = time.perf_counter() - start
+    start = time.perf_counter()
+    per_row = column.apply(preprocess_text)
+    timings['preprocess_text per row'] = time.perf_counter() - start
+    start = time.perf_counter()
+    vectorized = preprocess_series(column)
+    timings['preprocess_series'] = time.perf_counter() - start
+
+    assert per_row.equals(expected) and vectorized.equals(expected)
+
+    print(f"\n{'='*60}")
+    print(f"🧹 preprocess_text on {rows:,} rows (output identical)")
+    print(f"{'='*60}")
+    for name, seconds in timings.items():
+        speedup = timings['generator (original)'] / seconds
+        print(f"{name:>24} {seconds:>8.2f}s {speedup:>6.1f}x")
+
+
+def bench_pool(batches=50):
+    import os
+    from forest_arrays import ARRAYS_DIR
+    from worker_pool import PredictionPool
+
+    if not os.path.exists(os.path.join(ARRAYS_DIR, 'meta.json')):
+        print(f"\n⚠️ pool: no exported arrays in {ARRAYS_DIR!r}, train a model first")
+        return
+
+    texts = _symptom_texts(256, random.Random(42))
+    print(f"\n{'='*60}")
+    print("🧵 Serving pool memory per worker (MB, after warm-up)")
+    print(f"{'='*60}")
+    print(f"{'workers':>8} {'rss':>8} {'pss':>8} {'private':>8} {'batches/s':>10}")
+    for workers in (1, 2, 4):
+        with PredictionPool(workers) as pool:
+            start = time.perf_counter()
+            futures = [pool.submit(texts) for _ in range(batches)]
+            for future in futures:
+                future.result()
+            rate = batches / (time.perf_counter() - start)
+            usage = list(pool.memory().values())
+        if not usage:
+            print(f"{workers:>8} {'n/a':>8} {'n/a':>8} {'n/a':>8} {rate:>10.1f}")
+            continue
+        mean = {key: sum(u[key] for u in usage) / len(usage) for key in usage[0]}
+        print(f"{workers:>8} {mean['rss_mb']:>8.1f} {mean['pss_mb']:>8.1f} {mean['private_mb']:>8.1f} {rate:>10.1f}")
+
+    # A worker killed mid-request must fail that request, not hang it, and be replaced
+    import signal
+    with PredictionPool(1) as pool:
+        victim = pool._workers[0].process
+        future = pool.submit(_symptom_texts(200000, random.Random(3)))
+        time.sleep(0.2)
+        os.kill(victim.pid, signal.SIGKILL)
+        try:
+            future.result(timeout=60)
+            crashed = False
+        except RuntimeError:
+            crashed = True
+        served = len(pool.predict_batch(texts[:10], timeout=60))
+    assert crashed and served == 10, "pool did not recover from a dead worker"
+    print("✅ dead worker: its request failed and a replacement served the next one")
+
+
+def _load_ai(arrays=False):
+    from Backend import HealthcareAI
+
+    ai = HealthcareAI(cache_size=0)
+    return ai if (ai.load_arrays() if arrays else ai.load()) else None
+
+
+def bench_topk(k=3, samples=200):
+    import numpy as np
+    from Backend import _early_exit_proba, _tree_count, preprocess_text, top_k_indices
+
+    texts = [t for t in _symptom_texts(samples * 3, random.Random(7)) if validate_symptoms(t)[0]][:samples]
+    print(f"\n{'='*60}")
+    print(f"🩺 Top-{k} differential (ms per call)")
+    print(f"{'='*60}")
+    print(f"{'model':>8} {'predict+proba+sort':>19} {'proba+argpartition':>19} {'early exit':>11} {'trees':>6}")
+    for arrays in (False, True):
+        ai = _load_ai(arrays)
+        if ai is None:
+            print(f"⚠️ topk: no {'exported arrays' if arrays else 'trained model'} found")
+            continue
+        rows = [ai.vectorizer.transform([preprocess_text(t)]) for t in texts]
+
+        def original(X):
+            ai.model.predict(X)
+            probabilities = ai.model.predict_proba(X)[0]
+            return np.argsort(-probabilities)[:k]
+
+        def single_pass(X):
+            return top_k_indices(ai.model.predict_proba(X)[0], k)
+
+        trees = []
+
+        def early(X):
+            probabilities, used = _early_exit_proba(ai.model, X, 10)
+            trees.append(used)
+            return top_k_indices(probabilities, k)
+
+        timings = [_time_per_call(fn, rows, 1) / 1000 for fn in (original, single_pass, early)]
+        name = 'arrays' if arrays else 'sklearn'
+        print(f"{name:>8} {timings[0]:>19.2f} {timings[1]:>19.2f} {timings[2]:>11.2f} {np.mean(trees):>6.0f}")
+
+        # Early exit ranks the differential from a partial forest: it must say so,
+        # and diseases with no probability must not be listed
+        for text in texts[:20]:
+            result = ai.predict_top_k(text, k=len(ai.model.classes_), early_exit=True)
+            if 'differential' not in result:
+                continue
+            assert all(entry['probability'] > 0 for entry in result['differential']), "0% disease in differential"
+            assert result['partial'] == (result['trees_evaluated'] < _tree_count(ai.model)), \
+                "partial flag does not match trees evaluated"
+
+
+# Cold-start budget for importing the backend, and modules it must not pull in
+IMPORT_BUDGET_MS = 250
+TRAINING_ONLY_MODULES = ('pandas', 'sklearn', 'scipy', 'joblib')
+
+
+def bench_import(runs=5, budget_ms=IMPORT_BUDGET_MS):
+    import Backend
+
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(Backend.__file__)))
+    code = ("import sys, Backend; "
+            f"print(','.join(m for m in {TRAINING_ONLY_MODULES!r} if m in sys.modules))")
+    timings, leaked = [], ''
+    for _ in range(runs):
+        run = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                             capture_output=True, text=True, env=env, check=True)
+        leaked = run.stdout.strip()
+        for line in run.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == 'Backend':
+                timings.append(int(fields[1]) / 1000)
+
+    best = min(timings)
+    print(f"\n{'='*60}")
+    print("🚀 Cold import of Backend (python -X importtime)")
+    print(f"{'='*60}")
+    print(f"best of {runs}: {best:.1f} ms (budget {budget_ms} ms)")
+    print(f"training-only modules loaded: {leaked or 'none'}")
+    ok = best <= budget_ms and not leaked
+    print("✅ within budget" if ok else "❌ cold start regressed")
+    return ok
+
+
+def synthetic_dataset(path, rows=5580, seed=42):
+    # Labelled CSV shaped like dataset_improved.csv: each disease draws from
+    # its own symptom profile, with some noise symptoms and casing variety
+    rng = random.Random(seed)
+    symptoms = sorted(VALID_SYMPTOMS)
+    diseases = sorted(DISEASE_INFO)
+    profiles = {disease: rng.sample(symptoms, 7) for disease in diseases}
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['symptoms', 'disease'])
+        for row in range(rows):
+            disease = diseases[row % len(diseases)]
+            picked = rng.sample(profiles[disease], rng.randint(3, 5)) + rng.sample(symptoms, rng.randint(0, 1))
+            rng.shuffle(picked)
+            text = ', '.join(picked)
+            writer.writerow([text.capitalize() if rng.random() < 0.3 else text, disease])
+
+
+def synthetic_queries(count, seed=42, emergency_share=0.05):
+    # Intake-note style queries, a share of them carrying a red-flag phrase
+    rng = random.Random(seed)
+    symptoms = sorted(VALID_SYMPTOMS)
+    queries = []
+    for _ in range(count):
+        picked = rng.sample(symptoms, rng.randint(2, 5))
+        if rng.random() < emergency_share:
+            picked.append(rng.choice(EMERGENCY_KEYWORDS))
+        queries.append(', '.join(picked))
+    return queries
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def _peak_rss_mb():
+    # VmHWM belongs to this address space; ru_maxrss survives exec on Linux,
+    # so a spawned child would report its parent's peak
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _serving_probe(directory, queries, arrays, results):
+    # Runs in a fresh process per model path, so load time and peak RSS
+    # exclude training and the other path (VmHWM never goes back down)
+    os.chdir(directory)
+    from Backend import HealthcareAI
+
+    metrics = {}
+    name = 'arrays' if arrays else 'pickle'
+    ai = HealthcareAI(cache_size=0)
+    start = time.perf_counter()
+    ai.load_arrays() if arrays else ai.load()
+    metrics[f'load_{name}_s'] = time.perf_counter() - start
+
+    ai.predict(queries[0])
+    latencies = []
+    for query in queries[:300]:
+        start = time.perf_counter()
+        ai.predict(query)
+        latencies.append(time.perf_counter() - start)
+    metrics[f'single_{name}_p50_ms'] = _percentile(latencies, 50) * 1000
+    metrics[f'single_{name}_p99_ms'] = _percentile(latencies, 99) * 1000
+
+    start = time.perf_counter()
+    for i in range(0, len(queries), 1000):
+        ai.predict_batch(queries[i:i + 1000])
+    metrics[f'batch_{name}_rows_per_s'] = len(queries) / (time.perf_counter() - start)
+    metrics[f'serve_{name}_peak_rss_mb'] = _peak_rss_mb()
+    results.put(metrics)
+
+
+# Metrics where a larger value is better; every other metric is a cost
+HIGHER_IS_BETTER = ('batch_pickle_rows_per_s', 'batch_arrays_rows_per_s')
+
+
+def compare_results(current, baseline, threshold=0.2):
+    # Metrics that got worse than the baseline by more than threshold
+    regressions = []
+    for name, value in current['metrics'].items():
+        before = baseline.get('metrics', {}).get(name)
+        if not before:
+            continue
+        change = (value - before) / before
+        worse = -change if name in HIGHER_IS_BETTER else change
+        if worse > threshold:
+            regressions.append((name, before, value, worse))
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_suite(rows=5580, queries=5000, seed=42, output='bench_results.json', compare=None, threshold=0.2):
+    from Backend import HealthcareAI
+
+    directory = tempfile.mkdtemp(prefix='healthcare_bench_')
+    cwd = os.getcwd()
+    try:
+        os.chdir(directory)
+        synthetic_dataset('dataset_improved.csv', rows, seed)
+        sample = synthetic_queries(queries, seed)
+
+        print(f"🔄 Training on {rows:,} synthetic rows...")
+        start = time.perf_counter()
+        trained = HealthcareAI(cache_size=0)
+        trained.train('dataset_improved.csv')
+        bundle = trained.bundle
+        metrics = {
+            'train_s': time.perf_counter() - start,
+            'train_peak_rss_mb': _peak_rss_mb(),
+            'model_size_mb': sum(os.path.getsize(os.path.join(bundle, f)) for f in ('model.pkl', 'vectorizer.pkl')) / 1e6,
+        }
+
+        context = mp.get_context('spawn')
+        results = context.Queue()
+        for arrays in (False, True):
+            probe = context.Process(target=_serving_probe, args=(directory, sample, arrays, results))
+            probe.start()
+            metrics.update(results.get())
+            probe.join()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        'commit': _git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {'rows': rows, 'queries': queries, 'seed': seed},
+        'metrics': {name: round(value, 4) for name, value in metrics.items()},
+    }
+
+    print(f"\n{'='*60}")
+    print("📊 End-to-end benchmark")
+    print(f"{'='*60}")
+    for name, value in report['metrics'].items():
+        print(f"{name:>28} {value:>12,.3f}")
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved to {output}")
+
+    if compare:
+        with open(compare) as f:
+            regressions = compare_results(report, json.load(f), threshold)
+        for name, before, after, worse in regressions:
+            print(f"❌ {name}: {before:,.3f} → {after:,.3f} ({worse:+.0%} worse)")
+        if regressions:
+            return False
+        print(f"✅ No metric regressed by more than {threshold:.0%} against {compare}")
+    return True
+
+
+def _misspell(text, rng):
+    # Duplicate or drop one letter in one symptom word, e.g. fever -> feaver-like typos
+    words = text.split()
+    candidates = [i for i, word in enumerate(words) if len(word.strip(',')) > 4]
+    if not candidates:
+        return text
+    i = rng.choice(candidates)
+    word = words[i]
+    at = rng.randrange(1, len(word.strip(',')) - 1)
+    words[i] = word[:at] + word[at] + word[at:] if rng.random() < 0.5 else word[:at] + word[at + 1:]
+    return ' '.join(words)
+
+
+def bench_features(rows=5580, holdout=0.2, seed=42):
+    import pickle
+    from Backend import HealthcareAI, preprocess_text
+
+    directory = tempfile.mkdtemp(prefix='healthcare_features_')
+    cwd = os.getcwd()
+    try:
+        os.chdir(directory)
+        synthetic_dataset('all.csv', rows, seed)
+        with open('all.csv', newline='') as f:
+            records = list(csv.reader(f))
+        header, records = records[0], records[1:]
+        split = int(len(records) * (1 - holdout))
+        with open('dataset_improved.csv', 'w', newline='') as f:
+            csv.writer(f).writerows([header] + records[:split])
+        held_out = records[split:]
+        rng = random.Random(seed)
+        clean = [text for text, _ in held_out]
+        typos = [_misspell(text, rng) for text in clean]
+        labels = [disease for _, disease in held_out]
+        probe = [preprocess_text(text) for text in clean[:300]]
+
+        print(f"\n{'='*60}")
+        print(f"🔤 Featurization: fitted TF-IDF vs hashed char n-grams ({split:,} training rows)")
+        print(f"{'='*60}")
+        print(f"{'features':>9} {'accuracy':>9} {'typo acc':>9} {'µs/transform':>13} {'pickle KB':>10} {'columns':>8}")
+        for features in ('tfidf', 'hashing'):
+            ai = HealthcareAI(cache_size=0)
+            ai.train('dataset_improved.csv', features=features)
+
+            def accuracy(texts):
+                results = ai.predict_batch(texts)
+                return sum(r.get('disease') == label for r, label in zip(results, labels)) / len(labels)
+
+            transform = _time_per_call(lambda text: ai.vectorizer.transform([text]), probe, 3)
+            size_kb = len(pickle.dumps(ai.vectorizer)) / 1024
+            print(f"{features:>9} {accuracy(clean):>9.2%} {accuracy(typos):>9.2%} {transform:>13.1f} "
+                  f"{size_kb:>10.1f} {len(ai.vectorizer.idf_):>8}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _featurize_probe(path, chunk_size, spill_dir, results):
+    # Loads and featurizes like train() does, up to the forest fit, in a fresh process
+    import pandas as pd
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from Backend import VECTORIZER_PARAMS, preprocess_series, split_dataset
+    from streaming import stream_dataset
+
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+    if chunk_size:
+        data = stream_dataset(path, vectorizer, preprocess_series, chunk_size, spill_dir)
+        shape = data.X_train.shape
+    else:
+        df = pd.read_csv(path)
+        df['symptoms_clean'] = preprocess_series(df['symptoms'])
+        X_train, X_test, y_train, y_test = split_dataset(df)
+        shape = vectorizer.fit_transform(X_train).shape
+        vectorizer.transform(X_test)
+    results.put((time.perf_counter() - start, _peak_rss_mb() - baseline, shape))
+
+
+def bench_streaming(rows=500_000, chunk_size=50_000, seed=42):
+    directory = tempfile.mkdtemp(prefix='healthcare_stream_')
+    try:
+        path = os.path.join(directory, 'cases.csv')
+        synthetic_dataset(path, rows, seed)
+        print(f"\n{'='*60}")
+        print(f"🌊 Training data load + featurize, {rows:,} rows ({os.path.getsize(path) / 1e6:.0f} MB CSV)")
+        print(f"{'='*60}")
+        print(f"{'mode':>26} {'seconds':>8} {'peak RSS +MB':>13} {'train matrix':>14}")
+        context = mp.get_context('spawn')
+        for name, chunk, spill in (('read_csv + fit_transform', None, None),
+                                   (f'streamed, {chunk_size:,}-row chunks', chunk_size, None),
+                                   ('streamed + memmap spill', chunk_size, os.path.join(directory, 'spill'))):
+            results = context.Queue()
+            probe = context.Process(target=_featurize_probe, args=(path, chunk, spill, results))
+            probe.start()
+            seconds, peak_mb, shape = results.get()
+            probe.join()
+            print(f"{name:>26} {seconds:>8.1f} {peak_mb:>13.0f} {shape[0]:>7,}x{shape[1]:<6}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+# Same words and order, so the same cache key, but punctuation changes the screen
+_COALESCE_SCREEN_PAIRS = (
+    ('headache, fever, passing. out', 'headache, fever, passing out'),
+    ('fever cough', 'fever/cough'),
+    ('sore, throat, fever', 'sore throat, fever'),
+)
+
+
+def bench_coalesce(threads=16, bursts=30):
+    import threading
+    from Backend import HealthcareAI
+
+    # Every thread sends the same text at once, the way a retry storm or a
+    # popular query does; the cache is off so only coalescing can help
+    texts = [t for t in _symptom_texts(bursts * 3, random.Random(11)) if validate_symptoms(t)[0]][:bursts]
+    print(f"\n{'='*60}")
+    print(f"🔀 Bursts of {threads} identical requests, cache off")
+    print(f"{'='*60}")
+    print(f"{'mode':>10} {'ms/burst':>9} {'model passes':>13} {'coalesced':>10}")
+    for coalesce in (False, True):
+        ai = HealthcareAI(cache_size=0, coalesce=coalesce)
+        if not ai.load():
+            print("⚠️ coalesce: no trained model found")
+            return
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            for text in texts:
+                barrier.wait()
+                ai.predict(text)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed_ms = (time.perf_counter() - start) * 1000 / len(texts)
+        stats = ai.flights.stats() if ai.flights else {'leaders': threads * len(texts), 'coalesced': 0}
+        name = 'on' if coalesce else 'off'
+        print(f"{name:>10} {elapsed_ms:>9.1f} {stats['leaders']:>13} {stats['coalesced']:>10}")
+
+    # Texts with one coalescing key but different screening: each caller
+    # must get what predict() gives its own text
+    import asyncio
+
+    async def together(pair):
+        return await asyncio.gather(*(ai.predict_async(text) for text in pair))
+
+    for pair in _COALESCE_SCREEN_PAIRS:
+        for text, result in zip(pair, asyncio.run(together(pair))):
+            expected = ai.predict(text)
+            assert [result.get(k) for k in ('is_valid', 'is_emergency', 'disease')] == \
+                [expected.get(k) for k in ('is_valid', 'is_emergency', 'disease')], text
+    print(f"✅ predict_async screens each caller's own text ({len(_COALESCE_SCREEN_PAIRS)} pairs)")
+
+
+def bench_store(queries=500):
+    from Backend import HealthcareAI
+    from result_store import ResultStore
+
+    texts = [t for t in _symptom_texts(queries * 3, random.Random(13)) if validate_symptoms(t)[0]][:queries]
+    directory = tempfile.mkdtemp(prefix='healthcare_store_')
+    try:
+        print(f"\n{'='*60}")
+        print(f"🗄️ Persistent result store, {len(texts)} queries per fresh process")
+        print(f"{'='*60}")
+        print(f"{'run':>22} {'ms/query':>9} {'from disk':>10}")
+        # Each run is a new HealthcareAI with an empty in-memory cache, as
+        # after a restart; the store file carries over between them
+        path = os.path.join(directory, 'results.sqlite')
+        for name, store in (('no store', None), ('store, cold', path), ('store, warm restart', path)):
+            ai = HealthcareAI(cache_size=0, result_store=ResultStore(store) if store else None)
+            if not ai.load_bundle():
+                print("⚠️ store: no published model bundle found")
+                return
+            start = time.perf_counter()
+            ai.predict_batch(texts)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / len(texts)
+            hits = ai.store.stats()['hits'] if ai.store else 0
+            print(f"{name:>22} {elapsed_ms:>9.3f} {hits:>10}")
+            if ai.store:
+                ai.store.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_quantize(dataset_path='dataset_improved.csv', samples=200):
+    import joblib
+    import numpy as np
+    import pandas as pd
+    from artifacts import current_bundle
+    from forest_arrays import QUANTIZE_PARAMS, export_arrays, load_arrays
+    from Backend import split_dataset
+
+    bundle = current_bundle()
+    if bundle is None or not os.path.exists(dataset_path):
+        print("\n⚠️ quantize: needs a published model bundle and the dataset it was trained on")
+        return
+    model_path = os.path.join(bundle, 'model.pkl')
+    # The same held-out split train() scored the model on
+    df = pd.read_csv(dataset_path)
+    df['symptoms_clean'] = preprocess_series(df['symptoms'])
+    _, X_test, _, y_test = split_dataset(df)
+    labels = np.asarray(y_test).astype(str)
+
+    start = time.perf_counter()
+    model = joblib.load(model_path)
+    pickle_load_ms = (time.perf_counter() - start) * 1000
+    vectorizer = joblib.load(os.path.join(bundle, 'vectorizer.pkl'))
+    X = vectorizer.transform(X_test)
+    reference = model.predict(X).astype(str)
+
+    print(f"\n{'='*60}")
+    print(f"🗜️ Forest artifact: pickle vs array layouts ({len(labels)} held-out cases)")
+    print(f"{'='*60}")
+    print(f"{'layout':>22} {'MB':>7} {'load ms':>8} {'accuracy':>9} {'agrees':>7} {'ms/row':>7}")
+    print(f"{'sklearn pickle':>22} {os.path.getsize(model_path) / 1e6:>7.1f} {pickle_load_ms:>8.0f} "
+          f"{(reference == labels).mean():>9.2%} {'':>7} {'':>7}")
+
+    layouts = (('float64 arrays (exact)', {}),
+               ('uint16 dense (default)', QUANTIZE_PARAMS),
+               ('uint8 dense', dict(leaf_dtype='uint8')),
+               ('uint16 top-4', dict(leaf_dtype='uint16', leaf_top=4)),
+               ('uint8 top-2', dict(leaf_dtype='uint8', leaf_top=2)))
+    directory = tempfile.mkdtemp(prefix='healthcare_quantize_')
+    try:
+        for name, params in layouts:
+            path = os.path.join(directory, name.replace(' ', '_'))
+            export_arrays(model, vectorizer, path, **params)
+            size_mb = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6
+            # Read fully rather than mapped, to compare with unpickling
+            start = time.perf_counter()
+            forest, arrays_vectorizer = load_arrays(path, mmap_mode=None)
+            load_ms = (time.perf_counter() - start) * 1000
+            dense = arrays_vectorizer.transform(list(X_test))
+            predicted = forest.predict(dense).astype(str)
+            rows = [dense[i:i + 1] for i in range(min(samples, len(dense)))]
+            row_ms = _time_per_call(forest.predict_proba, rows, 1) / 1000
+            print(f"{name:>22} {size_mb:>7.1f} {load_ms:>8.0f} {(predicted == labels).mean():>9.2%} "
+                  f"{(predicted == reference).mean():>7.2%} {row_ms:>7.2f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+BENCHMARKS = {
+    'emergency': bench_emergency,
+    'extract': bench_extract,
+    'validate': bench_validate,
+    'preprocess': bench_preprocess,
+    'pool': bench_pool,
+    'topk': bench_topk,
+    'import': bench_import,
+    'features': bench_features,
+    'streaming': bench_streaming,
+    'coalesce': bench_coalesce,
+    'store': bench_store,
+    'quantize': bench_quantize,
+    'suite': bench_suite,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Healthcare AI benchmarks")
+    parser.add_argument('names', nargs='*', help=f"any of: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--rows', type=int, default=5580, help="suite: synthetic training rows")
+    parser.add_argument('--queries', type=int, default=5000, help="suite: synthetic queries")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results.json', help="suite: results file")
+    parser.add_argument('--compare', help="suite: baseline results file to check against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="suite: allowed relative regression")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    # Benchmarks that check a budget return False when it is exceeded
+    failed = []
+    for name in args.names or BENCHMARKS:
+        if name == 'suite':
+            ok = bench_suite(args.rows, args.queries, args.seed, args.output, args.compare, args.threshold)
+        else:
+            ok = BENCHMARKS[name]()
+        if ok is False:
+            failed.append(name)
+    if failed:
+        print(f"\n❌ Failed: {', '.join(failed)}")
+        sys.exit(1)
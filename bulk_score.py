@@ -0,0 +1,179 @@
+"""
+Healthcare AI - Bulk Scoring
+Streams a CSV or JSONL file of symptom texts in chunks, scores each chunk
+with one predict_batch call and appends the results as it goes, so files
+far larger than memory can be rescored whenever the model changes.
+
+Run: python bulk_score.py cases.csv scored.csv --chunk-size 5000 --jobs 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from Backend import HealthcareAI
+
+OUTPUT_FIELDS = ['row', 'status', 'disease', 'confidence', 'severity', 'message']
+
+
+def _is_jsonl(path):
+    return path.endswith(('.jsonl', '.ndjson'))
+
+
+def _counted_lines(f, progress):
+    for line in f:
+        progress['bytes'] += len(line.encode('utf-8'))
+        yield line
+
+
+def read_chunks(path, column='symptoms', chunk_size=5000, start_row=0, progress=None):
+    # Yields (first_row, texts) without ever holding more than one chunk
+    progress = progress if progress is not None else {'bytes': 0}
+    with open(path, newline='', encoding='utf-8') as f:
+        lines = _counted_lines(f, progress)
+        if _is_jsonl(path):
+            records = (json.loads(line).get(column, '') for line in lines if line.strip())
+        else:
+            reader = csv.DictReader(lines)
+            if column not in (reader.fieldnames or []):
+                raise ValueError(f"Column {column!r} not found in {path}")
+            records = (record[column] or '' for record in reader)
+
+        chunk, first_row = [], start_row
+        for row, text in enumerate(records):
+            if row < start_row:
+                continue
+            chunk.append(text)
+            if len(chunk) == chunk_size:
+                yield first_row, chunk
+                chunk, first_row = [], row + 1
+        if chunk:
+            yield first_row, chunk
+
+
+def _output_rows(first_row, results):
+    for offset, result in enumerate(results):
+        row = {'row': first_row + offset}
+        if not result.get('is_valid', True):
+            row.update(status='invalid', message=result['error'])
+        elif result['is_emergency']:
+            row.update(status='emergency', severity='Critical', message=result['message'])
+        else:
+            row.update(status='ok', disease=result['disease'], confidence=result['confidence'],
+                       severity=result['severity'])
+        yield row
+
+
+class ResultWriter:
+    def __init__(self, path, append=False):
+        self.jsonl = _is_jsonl(path)
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self.f = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.f, fieldnames=OUTPUT_FIELDS)
+            if not exists:
+                self.writer.writeheader()
+
+    def write(self, first_row, results):
+        for row in _output_rows(first_row, results):
+            if self.jsonl:
+                self.f.write(json.dumps(row) + '\n')
+            else:
+                self.writer.writerow(row)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def completed_rows(output_path):
+    # Rows already written by an interrupted run, for --resume
+    if not os.path.exists(output_path):
+        return 0
+    with open(output_path, encoding='utf-8') as f:
+        count = sum(1 for line in f if line.strip())
+    return count if _is_jsonl(output_path) else max(count - 1, 0)
+
+
+def score_file(ai, input_path, output_path, column='symptoms', chunk_size=5000,
+               start_row=0, jobs=1, pool=None, show_progress=True):
+    progress = {'bytes': 0}
+    total_bytes = os.path.getsize(input_path) or 1
+    writer = ResultWriter(output_path, append=start_row > 0)
+    scored, started = 0, time.perf_counter()
+
+    def report():
+        if show_progress:
+            elapsed = time.perf_counter() - started
+            percent = min(progress['bytes'] / total_bytes * 100, 100.0)
+            sys.stderr.write(f"\r⏳ {percent:5.1f}% | {start_row + scored:,} rows | "
+                             f"{scored / elapsed if elapsed else 0:,.0f} rows/s")
+            sys.stderr.flush()
+
+    try:
+        chunks = read_chunks(input_path, column, chunk_size, start_row, progress)
+        if pool is None:
+            for first_row, texts in chunks:
+                writer.write(first_row, ai.predict_batch(texts))
+                scored += len(texts)
+                report()
+        else:
+            # Keep a bounded window of chunks in flight and write them in order
+            in_flight = deque()
+            for first_row, texts in chunks:
+                in_flight.append((first_row, len(texts), pool.submit(texts)))
+                while len(in_flight) >= jobs * 2:
+                    first, count, future = in_flight.popleft()
+                    writer.write(first, future.result())
+                    scored += count
+                    report()
+            while in_flight:
+                first, count, future = in_flight.popleft()
+                writer.write(first, future.result())
+                scored += count
+                report()
+    finally:
+        writer.close()
+        if show_progress:
+            sys.stderr.write('\n')
+    return scored
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV/JSONL file of symptom texts")
+    parser.add_argument('input', help="CSV or .jsonl file with a symptoms column/field")
+    parser.add_argument('output', help="CSV or .jsonl file to write results to")
+    parser.add_argument('--column', default='symptoms')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--start-row', type=int, default=0, help="Skip this many input rows")
+    parser.add_argument('--resume', action='store_true', help="Continue after the rows already in output")
+    parser.add_argument('--jobs', type=int, default=1, help="Worker processes scoring chunks in parallel")
+    parser.add_argument('--arrays', action='store_true', help="Use the exported NumPy model arrays")
+    args = parser.parse_args()
+
+    start_row = completed_rows(args.output) if args.resume else args.start_row
+
+    ai, pool = HealthcareAI(cache_size=0), None
+    if args.jobs > 1:
+        from worker_pool import PredictionPool
+        pool = PredictionPool(args.jobs).start()
+    elif not (ai.load_arrays() if args.arrays else ai.load()):
+        print("❌ No trained model found. Run Backend.py first to train one.")
+        raise SystemExit(1)
+
+    print(f"🔄 Scoring {args.input} from row {start_row:,}...")
+    try:
+        total = score_file(ai, args.input, args.output, args.column, args.chunk_size,
+                           start_row, args.jobs, pool)
+    except RuntimeError as exc:
+        # A chunk failed (e.g. its worker died); rows before it are already written
+        print(f"❌ {exc}\n   Rerun with --resume to continue after the rows already scored.")
+        raise SystemExit(1)
+    finally:
+        if pool is not None:
+            pool.close()
+    print(f"✅ Scored {total:,} rows → {args.output}")
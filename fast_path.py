@@ -0,0 +1,125 @@
+"""
+Healthcare AI - Distilled Fast Path
+A softmax-linear student fitted to the forest's out-of-bag probabilities.
+It costs one small matrix product per request; when the gap between its top
+two classes clears a margin chosen on the held-out split, its answer is
+used and the forest is skipped. Everything else falls back to the forest.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+FAST_PATH_FILE = 'fast_path.npz'
+
+# Share of fast-path answers that must match the forest on the held-out split
+MIN_AGREEMENT = 0.995
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+def _margins(proba):
+    # Top-1 minus top-2 probability per row
+    top_two = np.partition(proba, -2, axis=1)[:, -2:]
+    return top_two[:, 1] - top_two[:, 0]
+
+
+class DistilledModel:
+    def __init__(self, coef, intercept, classes, margin=1.0, report=None):
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.classes_ = classes
+        self.margin = margin
+        self.report = report or {}
+
+    @classmethod
+    def fit(cls, X, soft_targets, classes, l2=1e-4, max_iter=300):
+        # Cross-entropy against the forest's probabilities rather than the
+        # labels, so the student learns where the forest is unsure as well
+        from scipy.optimize import minimize
+
+        n_rows, n_features = X.shape
+        n_classes = soft_targets.shape[1]
+
+        def loss(flat):
+            W = flat[:-n_classes].reshape(n_features, n_classes)
+            b = flat[-n_classes:]
+            proba = _softmax(np.asarray(X @ W) + b)
+            value = -np.sum(soft_targets * np.log(proba + 1e-12)) / n_rows + l2 * np.sum(W * W)
+            residual = (proba - soft_targets) / n_rows
+            grad_W = np.asarray(X.T @ residual) + 2 * l2 * W
+            return value, np.concatenate([grad_W.ravel(), residual.sum(axis=0)])
+
+        start = np.zeros(n_features * n_classes + n_classes)
+        result = minimize(loss, start, jac=True, method='L-BFGS-B', options={'maxiter': max_iter})
+        coef = result.x[:-n_classes].reshape(n_features, n_classes)
+        return cls(coef, result.x[-n_classes:], np.asarray(classes).astype(str))
+
+    def predict_proba(self, X):
+        return _softmax(np.asarray(X @ self.coef_) + self.intercept_)
+
+    def confident(self, proba):
+        # Rows whose margin clears the threshold
+        return _margins(proba) >= self.margin
+
+    def choose_margin(self, proba, forest_labels, min_agreement=MIN_AGREEMENT):
+        # Lowest margin whose accepted rows agree with the forest often enough
+        margins = _margins(proba)
+        agrees = proba.argmax(axis=1) == forest_labels
+        order = np.argsort(-margins)
+        agreement = np.cumsum(agrees[order]) / np.arange(1, len(order) + 1)
+        passing = np.flatnonzero(agreement >= min_agreement)
+        # Accept down to the last prefix that still agrees well enough
+        self.margin = float(margins[order[passing[-1]]]) if len(passing) else 1.0
+        return self.margin
+
+    def evaluate(self, X, forest, samples=200):
+        # Hit rate, agreement with the forest and single-row latency, fast path vs forest only
+        proba = self.predict_proba(X)
+        forest_proba = forest.predict_proba(X)
+        confident = self.confident(proba)
+        combined = np.where(confident, proba.argmax(axis=1), forest_proba.argmax(axis=1))
+
+        rows = [X[i:i + 1] for i in range(min(samples, X.shape[0]))]
+        start = time.perf_counter()
+        for row in rows:
+            forest.predict_proba(row)
+        forest_ms = (time.perf_counter() - start) / len(rows) * 1000
+        start = time.perf_counter()
+        for row in rows:
+            student = self.predict_proba(row)
+            if not self.confident(student)[0]:
+                forest.predict_proba(row)
+        two_tier_ms = (time.perf_counter() - start) / len(rows) * 1000
+
+        self.report = {
+            'margin': round(self.margin, 4),
+            'hit_rate': round(float(confident.mean()), 4),
+            'fast_path_agreement': round(float((combined == forest_proba.argmax(axis=1))[confident].mean()), 4)
+            if confident.any() else None,
+            'overall_agreement': round(float((combined == forest_proba.argmax(axis=1)).mean()), 4),
+            'forest_ms': round(forest_ms, 3),
+            'two_tier_ms': round(two_tier_ms, 3),
+        }
+        return self.report
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.savez(os.path.join(directory, FAST_PATH_FILE), coef=self.coef_, intercept=self.intercept_,
+                 classes=self.classes_, margin=self.margin, report=json.dumps(self.report))
+
+    @classmethod
+    def load(cls, directory):
+        path = os.path.join(directory, FAST_PATH_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data['coef'], data['intercept'], data['classes'], float(data['margin']),
+                       json.loads(str(data['report'])))
@@ -0,0 +1,253 @@
+"""
+Healthcare AI - Array-backed Inference
+Exports the trained forest and TF-IDF vocabulary as flat NumPy arrays and
+scores them with NumPy alone, memory-mapping the files so worker processes
+share pages and start without unpickling sklearn objects.
+
+Optionally quantized: leaf distributions become uint8/uint16 weights, dense
+or as each leaf's top-m classes, split features int16 and thresholds
+float32, and scores are summed in float32.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+
+from hashed_features import HashingTfidfVectorizer
+
+ARRAYS_DIR = 'model_arrays'
+
+# Defaults for HealthcareAI.train(quantize=True). uint16 weights keep every
+# leaf within 1/65535 of its distribution; leaf_top trims leaves to their m
+# largest classes, smaller still but it can flip near-tied predictions
+QUANTIZE_PARAMS = dict(
+    leaf_dtype='uint16',
+    leaf_top=None,
+)
+
+_LEAF_SCALES = {'uint8': 255, 'uint16': 65535}
+
+
+def _float32_floor(threshold):
+    # Largest float32 not above each threshold: for float32 features
+    # x <= t and x <= floor32(t) agree, so splits go the same way
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _quantize_leaves(values, leaf_dtype, leaf_top):
+    # (classes or None, weights, scale); each leaf's kept weights sum to scale
+    classes = None
+    n_classes = values.shape[1]
+    if leaf_top is not None and leaf_top < n_classes:
+        classes = np.argsort(-values, axis=1, kind='stable')[:, :leaf_top]
+        classes = classes.astype(np.uint8 if n_classes <= 256 else np.uint16)
+        values = np.take_along_axis(values, classes, axis=1)
+        kept = values.sum(axis=1, keepdims=True)
+        kept[kept == 0] = 1.0
+        values = values / kept
+    if leaf_dtype is None:
+        return classes, values.astype(np.float32), 1.0
+    scale = _LEAF_SCALES[leaf_dtype]
+    return classes, np.rint(values * scale).astype(leaf_dtype), scale
+
+
+def export_arrays(model, vectorizer, directory=ARRAYS_DIR, leaf_dtype=None, leaf_top=None):
+    # leaf_dtype ('uint8'/'uint16') and leaf_top (classes kept per leaf) turn
+    # on the quantized layout; without either the export is exact
+    if leaf_dtype is not None and leaf_dtype not in _LEAF_SCALES:
+        raise ValueError(f"leaf_dtype must be one of {sorted(_LEAF_SCALES)}, got {leaf_dtype!r}")
+    quantized = leaf_dtype is not None or leaf_top is not None
+    os.makedirs(directory, exist_ok=True)
+
+    # All trees packed into one node table; leaves keep feature -1 and store
+    # their row in leaf_values in the left-child slot
+    features, thresholds, lefts, rights, roots, leaf_values = [], [], [], [], [], []
+    offset = leaf_offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left < 0
+        leaf_ids = np.cumsum(is_leaf) - 1 + leaf_offset
+        values = tree.value[is_leaf, 0, :]
+        totals = values.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+
+        features.append(np.where(is_leaf, -1, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(is_leaf, leaf_ids, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, leaf_ids, tree.children_right + offset).astype(np.int32))
+        leaf_values.append(values / totals)
+        roots.append(offset)
+        offset += tree.node_count
+        leaf_offset += int(is_leaf.sum())
+
+    hashing = isinstance(vectorizer, HashingTfidfVectorizer)
+    # Hashed features have no vocabulary; their columns are crc32 buckets
+    terms = [] if hashing else sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    feature = np.concatenate(features)
+    threshold = np.concatenate(thresholds)
+    leaf_values = np.concatenate(leaf_values)
+    leaf_classes, scale = None, 1.0
+    if quantized:
+        if len(vectorizer.idf_) <= np.iinfo(np.int16).max:
+            feature = feature.astype(np.int16)
+        threshold = _float32_floor(threshold)
+        leaf_classes, leaf_values, scale = _quantize_leaves(leaf_values, leaf_dtype, leaf_top)
+    arrays = {
+        'feature': feature,
+        'threshold': threshold,
+        'left': np.concatenate(lefts),
+        'right': np.concatenate(rights),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'leaf_values': leaf_values,
+        'classes': np.asarray(model.classes_).astype(str),
+        'terms': np.asarray(terms, dtype=str),
+        'idf': np.asarray(vectorizer.idf_, dtype=np.float64),
+    }
+    if leaf_classes is not None:
+        arrays['leaf_classes'] = leaf_classes
+    elif os.path.exists(os.path.join(directory, 'leaf_classes.npy')):
+        os.remove(os.path.join(directory, 'leaf_classes.npy'))
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), array)
+
+    if hashing:
+        meta = {'features': 'hashing', 'hashing': vectorizer.get_params()}
+    else:
+        meta = {
+            'features': 'tfidf',
+            'lowercase': vectorizer.lowercase,
+            'token_pattern': vectorizer.token_pattern,
+            'ngram_range': list(vectorizer.ngram_range),
+            'sublinear_tf': vectorizer.sublinear_tf,
+            'norm': vectorizer.norm,
+        }
+    meta['max_depth'] = int(max(estimator.tree_.max_depth for estimator in model.estimators_))
+    if quantized:
+        meta['quantized'] = {'leaf_dtype': leaf_dtype, 'leaf_top': leaf_top, 'leaf_scale': scale}
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+class ArrayVectorizer:
+    # TF-IDF transform matching sklearn's TfidfVectorizer for word analyzers
+    def __init__(self, terms, idf, meta):
+        self.vocabulary_ = {term: i for i, term in enumerate(terms.tolist())}
+        self.idf_ = idf
+        self.lowercase = meta['lowercase']
+        self.token_pattern = re.compile(meta['token_pattern'])
+        self.ngram_range = tuple(meta['ngram_range'])
+        self.sublinear_tf = meta['sublinear_tf']
+        self.norm = meta['norm']
+
+    def _ngrams(self, text):
+        if self.lowercase:
+            text = text.lower()
+        tokens = self.token_pattern.findall(text)
+        min_n, max_n = self.ngram_range
+        for n in range(min_n, min(max_n, len(tokens)) + 1):
+            for i in range(len(tokens) - n + 1):
+                yield ' '.join(tokens[i:i + n])
+
+    def transform(self, texts):
+        X = np.zeros((len(texts), len(self.idf_)), dtype=np.float64)
+        vocabulary = self.vocabulary_
+        for row, text in enumerate(texts):
+            for gram in self._ngrams(text):
+                column = vocabulary.get(gram)
+                if column is not None:
+                    X[row, column] += 1.0
+        if self.sublinear_tf:
+            counted = X > 0
+            X[counted] = np.log(X[counted]) + 1.0
+        X *= self.idf_
+        if self.norm == 'l2':
+            norms = np.sqrt((X * X).sum(axis=1, keepdims=True))
+            norms[norms == 0] = 1.0
+            X /= norms
+        elif self.norm == 'l1':
+            norms = np.abs(X).sum(axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            X /= norms
+        return X
+
+
+class ArrayForest:
+    # Walks every tree for every row at once, one depth level per step
+    def __init__(self, arrays, max_depth, leaf_scale=None):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.roots = arrays['roots']
+        self.leaf_values = arrays['leaf_values']
+        # Quantized exports: top-m class ids per leaf, and weight per unit probability
+        self.leaf_classes = arrays.get('leaf_classes')
+        self.leaf_scale = leaf_scale
+        self.dtype = np.float64 if leaf_scale is None else np.float32
+        self.classes_ = arrays['classes']
+        self.max_depth = max_depth
+
+    def apply(self, X):
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, np.where(internal, feature, 0)] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, self.left[nodes], self.right[nodes]), nodes)
+        return self.left[nodes]
+
+    def _add_leaves(self, totals, leaves):
+        if self.leaf_classes is None:
+            # Accumulate tree by tree so a large batch never gathers rows x trees x classes
+            for tree in range(leaves.shape[1]):
+                totals += self.leaf_values[leaves[:, tree]]
+            return totals
+        # Top-m leaves gather only rows x trees x m entries, summed in one bincount
+        n_rows, n_classes = totals.shape
+        cells = np.arange(n_rows)[:, None, None] * n_classes + self.leaf_classes[leaves]
+        totals += np.bincount(cells.ravel(), weights=self.leaf_values[leaves].ravel(),
+                              minlength=n_rows * n_classes).reshape(n_rows, n_classes)
+        return totals
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        proba = self._add_leaves(np.zeros((len(leaves), len(self.classes_)), dtype=self.dtype), leaves)
+        if self.leaf_scale is None:
+            return proba / leaves.shape[1]
+        # Quantized weights are dequantized once, after summing
+        return proba * np.float32(1.0 / (self.leaf_scale * leaves.shape[1]))
+
+    def predict(self, X):
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+
+def load_arrays(directory=ARRAYS_DIR, mmap_mode='r'):
+    # ARRAYS_DIR is a symlink switched on each publish; resolve it once
+    directory = os.path.realpath(directory)
+    def load(name):
+        return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+    quantized = meta.get('quantized')
+    names = ['feature', 'threshold', 'left', 'right', 'roots', 'leaf_values', 'classes']
+    if quantized and quantized['leaf_top'] is not None and os.path.exists(os.path.join(directory, 'leaf_classes.npy')):
+        names.append('leaf_classes')
+    forest = ArrayForest({name: load(name) for name in names}, meta['max_depth'],
+                         quantized['leaf_scale'] if quantized else None)
+    if meta.get('features') == 'hashing':
+        vectorizer = HashingTfidfVectorizer(**meta['hashing'], dense=True)
+        vectorizer.idf_ = load('idf')
+    else:
+        vectorizer = ArrayVectorizer(load('terms'), load('idf'), meta)
+    return forest, vectorizer
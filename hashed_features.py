@@ -0,0 +1,134 @@
+"""
+Healthcare AI - Hashed TF-IDF Features
+Stateless alternative to TfidfVectorizer: n-grams are hashed straight into
+a fixed number of columns, so there is no vocabulary dict to fit, pickle or
+keep in every worker. Only the IDF weights are learned. Character n-grams
+inside word boundaries (the default) also score misspellings such as
+"feaver" close to the word they were meant to be.
+"""
+
+import re
+import zlib
+
+import numpy as np
+
+# Defaults for HealthcareAI.train(features='hashing')
+HASHING_PARAMS = dict(
+    analyzer='char_wb',
+    ngram_range=(2, 4),
+    n_features=2 ** 12,
+    sublinear_tf=True,
+)
+
+
+class HashingTfidfVectorizer:
+    # Columns come from crc32 of each n-gram, which is stable across processes
+    # and Python versions, unlike hash()
+    def __init__(self, analyzer='char_wb', ngram_range=(2, 4), n_features=2 ** 12,
+                 sublinear_tf=True, norm='l2', token_pattern=r'(?u)\b\w+\b', dense=False):
+        if analyzer not in ('word', 'char_wb'):
+            raise ValueError(f"analyzer must be 'word' or 'char_wb', got {analyzer!r}")
+        self.analyzer = analyzer
+        self.ngram_range = tuple(ngram_range)
+        self.n_features = n_features
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        self.token_pattern = token_pattern
+        # Dense output feeds ArrayForest; sparse output feeds sklearn
+        self.dense = dense
+        self.idf_ = None
+        self._tokens = re.compile(token_pattern)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_tokens']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._tokens = re.compile(self.token_pattern)
+
+    def _ngrams(self, text):
+        tokens = self._tokens.findall(text.lower())
+        min_n, max_n = self.ngram_range
+        if self.analyzer == 'word':
+            for n in range(min_n, min(max_n, len(tokens)) + 1):
+                for i in range(len(tokens) - n + 1):
+                    yield ' '.join(tokens[i:i + n])
+            return
+        # char_wb: n-grams within each space-padded word; as in sklearn, a word
+        # no longer than n yields itself once and stops the larger sizes
+        for token in tokens:
+            padded = f' {token} '
+            for n in range(min_n, max_n + 1):
+                for i in range(max(len(padded) - n, 0) + 1):
+                    yield padded[i:i + n]
+                if n >= len(padded):
+                    break
+
+    def _counts(self, texts):
+        # (rows, columns) of every n-gram occurrence
+        rows, columns = [], []
+        n_features = self.n_features
+        for row, text in enumerate(texts):
+            hashed = [zlib.crc32(gram.encode('utf-8')) % n_features for gram in self._ngrams(text)]
+            rows.extend([row] * len(hashed))
+            columns.extend(hashed)
+        return np.asarray(rows, dtype=np.int64), np.asarray(columns, dtype=np.int64)
+
+    def _term_frequencies(self, texts, dense):
+        rows, columns = self._counts(texts)
+        if dense:
+            X = np.bincount(rows * self.n_features + columns,
+                            minlength=len(texts) * self.n_features).astype(np.float64)
+            return X.reshape(len(texts), self.n_features)
+        from scipy import sparse
+        X = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)),
+                              shape=(len(texts), self.n_features))
+        X.sum_duplicates()
+        return X
+
+    def fit(self, texts):
+        # Same smoothed IDF as TfidfVectorizer
+        X = self._term_frequencies(list(texts), dense=False)
+        document_frequency = np.bincount(X.indices, minlength=self.n_features)
+        self.idf_ = np.log((1 + X.shape[0]) / (1 + document_frequency)) + 1
+        return self
+
+    def fit_transform(self, texts):
+        texts = list(texts)
+        return self.fit(texts).transform(texts)
+
+    def transform(self, texts):
+        texts = list(texts)
+        dense = self.dense
+        X = self._term_frequencies(texts, dense)
+        values = X if dense else X.data
+        if self.sublinear_tf:
+            counted = values > 0
+            values[counted] = np.log(values[counted]) + 1.0
+        if dense:
+            X *= self.idf_
+        else:
+            X.data *= self.idf_[X.indices]
+        if self.norm == 'l2':
+            norms = np.sqrt(np.asarray((X.multiply(X) if not dense else X * X).sum(axis=1))).ravel()
+        elif self.norm == 'l1':
+            norms = np.asarray(abs(X).sum(axis=1)).ravel()
+        else:
+            return X
+        norms[norms == 0] = 1.0
+        if dense:
+            return X / norms[:, None]
+        X.data /= np.repeat(norms, np.diff(X.indptr))
+        return X
+
+    def get_params(self):
+        return {
+            'analyzer': self.analyzer,
+            'ngram_range': list(self.ngram_range),
+            'n_features': self.n_features,
+            'sublinear_tf': self.sublinear_tf,
+            'norm': self.norm,
+            'token_pattern': self.token_pattern,
+        }
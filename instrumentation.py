@@ -0,0 +1,139 @@
+"""
+Healthcare AI - Hot-path Instrumentation
+Per-stage latency histograms and outcome counters for HealthcareAI.
+Disabled by default; when off, each stage costs one attribute check.
+"""
+
+import json
+import threading
+import time
+
+# HDR-style buckets: 8 linear sub-buckets per power of two nanoseconds,
+# so every recorded value is within 12.5% of its bucket's lower bound
+_SUB_BUCKET_BITS = 3
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+_MAX_BUCKETS = 64 * _SUB_BUCKETS
+
+
+def _bucket_index(ns):
+    if ns < _SUB_BUCKETS:
+        return max(ns, 0)
+    exponent = ns.bit_length() - _SUB_BUCKET_BITS
+    return exponent * _SUB_BUCKETS + ((ns >> (exponent - 1)) & (_SUB_BUCKETS - 1))
+
+
+def _bucket_upper_ns(index):
+    # Largest value that lands in the bucket
+    if index < _SUB_BUCKETS:
+        return index
+    exponent, sub = divmod(index, _SUB_BUCKETS)
+    return ((_SUB_BUCKETS | sub) << (exponent - 1)) + (1 << (exponent - 1)) - 1
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * _MAX_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        self.counts[_bucket_index(ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        rank, seen = q / 100.0 * self.count, 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(_bucket_upper_ns(index), self.max_ns) / 1e9
+        return self.max_ns / 1e9
+
+    def buckets(self):
+        # (upper bound in seconds, cumulative count) for non-empty buckets
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count:
+                seen += count
+                yield _bucket_upper_ns(index) / 1e9, seen
+
+
+class Metrics:
+    STAGES = ('extract', 'screen', 'cache', 'store', 'transform', 'fast_path', 'predict_proba', 'payload')
+    OUTCOMES = ('invalid', 'emergency', 'predicted', 'cached', 'fast_path', 'coalesced', 'stored')
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+            self.counters = dict.fromkeys(self.OUTCOMES, 0)
+
+    def lap(self, stage, started_ns):
+        # Records the time since started_ns and returns now for the next stage
+        now = time.perf_counter_ns()
+        with self._lock:
+            self.histograms[stage].record(now - started_ns)
+        return now
+
+    def count(self, outcome, n=1):
+        with self._lock:
+            self.counters[outcome] += n
+
+    def snapshot(self):
+        with self._lock:
+            stages = {
+                stage: {
+                    'count': h.count,
+                    'mean_ms': round(h.total_ns / h.count / 1e6, 4) if h.count else 0.0,
+                    'p50_ms': round(h.percentile(50) * 1000, 4),
+                    'p95_ms': round(h.percentile(95) * 1000, 4),
+                    'p99_ms': round(h.percentile(99) * 1000, 4),
+                    'max_ms': round(h.max_ns / 1e6, 4),
+                }
+                for stage, h in self.histograms.items()
+            }
+            return {'enabled': self.enabled, 'stages': stages, 'outcomes': dict(self.counters)}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix='healthcare_ai'):
+        lines = [
+            f'# HELP {prefix}_stage_seconds Time spent in each predict stage.',
+            f'# TYPE {prefix}_stage_seconds histogram',
+        ]
+        with self._lock:
+            for stage, h in self.histograms.items():
+                for upper, cumulative in h.buckets():
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{upper:.9g}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {h.total_ns / 1e9:.9g}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {h.count}')
+
+            lines.append(f'# HELP {prefix}_stage_quantile_seconds Stage latency quantiles.')
+            lines.append(f'# TYPE {prefix}_stage_quantile_seconds gauge')
+            for stage, h in self.histograms.items():
+                for q in (50, 95, 99):
+                    lines.append(f'{prefix}_stage_quantile_seconds{{stage="{stage}",quantile="{q / 100}"}} '
+                                 f'{h.percentile(q):.9g}')
+
+            lines.append(f'# HELP {prefix}_outcomes_total Requests by outcome.')
+            lines.append(f'# TYPE {prefix}_outcomes_total counter')
+            for outcome, value in self.counters.items():
+                lines.append(f'{prefix}_outcomes_total{{outcome="{outcome}"}} {value}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,187 @@
+"""
+Healthcare AI - Persistent Result Store
+Prediction results kept in a local SQLite file, keyed by the model's bundle
+id plus the normalized symptom text. Every worker process can share one file
+(WAL mode, so readers never block each other) and it outlives restarts, so a
+fresh worker answers common complaints from disk without running the model.
+Only the disease and confidence are stored; the rest of the response is
+rebuilt from the loaded model's payloads. Past max_entries the least
+recently used rows are evicted.
+"""
+
+import sqlite3
+import threading
+import time
+
+RESULT_STORE_FILE = 'prediction_results.sqlite'
+
+# Rows kept before the least recently used are evicted
+MAX_ENTRIES = 200_000
+
+# A hit refreshes its row's last-used time at most this often (seconds), so
+# repeat hits stay read-only
+TOUCH_INTERVAL = 3600
+
+# Writes between size checks, and the share of max_entries eviction leaves
+EVICT_EVERY = 512
+EVICT_TO = 0.9
+
+# Host parameters per statement, under SQLite's lowest compiled-in limit
+_BATCH = 500
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS results ('
+    ' model TEXT NOT NULL, key TEXT NOT NULL, disease TEXT NOT NULL,'
+    ' confidence REAL NOT NULL, used INTEGER NOT NULL,'
+    ' PRIMARY KEY (model, key)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS results_used ON results (used)',
+)
+
+
+class ResultStore:
+    # One connection per thread; SQLite locks the file across processes.
+    # Storage errors are counted and treated as misses, never raised into
+    # a prediction
+    def __init__(self, path=RESULT_STORE_FILE, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+        self._writes_since_check = 0
+        self._connections = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Opened here so a bad path fails at startup rather than per request
+        self._connection()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # WAL with synchronous=NORMAL: a crash can lose the last writes,
+            # which for a cache only means recomputing them
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _failed(self, exc):
+        with self._lock:
+            self.errors += 1
+            first = self.errors == 1
+        if first:
+            print(f"⚠️ Result store {self.path} unavailable, serving without it: {exc}")
+
+    def get(self, model, key):
+        # (disease, confidence) or None
+        return self.get_many(model, [key]).get(key)
+
+    def get_many(self, model, keys):
+        # {key: (disease, confidence)} for the keys that are stored
+        found, stale = {}, []
+        now = int(time.time())
+        try:
+            connection = self._connection()
+            for start in range(0, len(keys), _BATCH):
+                chunk = keys[start:start + _BATCH]
+                rows = connection.execute(
+                    'SELECT key, disease, confidence, used FROM results WHERE model = ? AND key IN '
+                    f'({",".join("?" * len(chunk))})', (model, *chunk))
+                for key, disease, confidence, used in rows:
+                    found[key] = (disease, confidence)
+                    if used < now - TOUCH_INTERVAL:
+                        stale.append(key)
+            for start in range(0, len(stale), _BATCH):
+                chunk = stale[start:start + _BATCH]
+                connection.execute(
+                    f'UPDATE results SET used = ? WHERE model = ? AND key IN ({",".join("?" * len(chunk))})',
+                    (now, model, *chunk))
+        except sqlite3.Error as exc:
+            self._failed(exc)
+            return {}
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, model, key, disease, confidence):
+        self.put_many(model, [(key, disease, confidence)])
+
+    def put_many(self, model, entries):
+        # entries: (key, disease, confidence) tuples
+        if not entries or self.max_entries <= 0:
+            return
+        now = int(time.time())
+        try:
+            connection = self._connection()
+            connection.executemany(
+                'INSERT OR REPLACE INTO results (model, key, disease, confidence, used) VALUES (?, ?, ?, ?, ?)',
+                [(model, key, str(disease), float(confidence), now) for key, disease, confidence in entries])
+        except sqlite3.Error as exc:
+            self._failed(exc)
+            return
+        with self._lock:
+            self.writes += len(entries)
+            self._writes_since_check += len(entries)
+            check = self._writes_since_check >= EVICT_EVERY
+            if check:
+                self._writes_since_check = 0
+        if check:
+            self.evict()
+
+    def evict(self):
+        # Trims the file to EVICT_TO of max_entries, oldest use first; rows
+        # of retired models age out the same way
+        try:
+            connection = self._connection()
+            size = connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            if size <= self.max_entries:
+                return 0
+            excess = size - int(self.max_entries * EVICT_TO)
+            connection.execute(
+                'DELETE FROM results WHERE (model, key) IN '
+                '(SELECT model, key FROM results ORDER BY used LIMIT ?)', (excess,))
+        except sqlite3.Error as exc:
+            self._failed(exc)
+            return 0
+        with self._lock:
+            self.evictions += excess
+        return excess
+
+    def clear(self, model=None):
+        connection = self._connection()
+        if model is None:
+            connection.execute('DELETE FROM results')
+        else:
+            connection.execute('DELETE FROM results WHERE model = ?', (model,))
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    def stats(self):
+        try:
+            size = self._connection().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        with self._lock:
+            return {
+                'path': self.path,
+                'size': size,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'errors': self.errors,
+            }
@@ -0,0 +1,227 @@
+"""
+Healthcare AI - Async Inference Service
+Standalone asyncio HTTP/1.1 server that gathers concurrent predict requests
+into micro-batches and scores each batch with one HealthcareAI.predict_batch
+call in a worker thread.
+
+Run: python serve.py --port 8000 --max-batch-size 64 --max-wait-ms 2
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from Backend import HealthcareAI
+
+
+class MicroBatcher:
+    # Queues single requests and flushes them when the batch is full or the
+    # oldest request has waited max_wait_ms
+    def __init__(self, ai, max_batch_size=64, max_wait_ms=2.0, executor=None):
+        self.ai = ai
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.items = 0
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, symptoms):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((symptoms, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [symptoms for symptoms, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.ai.predict_batch, texts)
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            self.batches += 1
+            self.items += len(batch)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+        }
+
+
+class PredictionService:
+    # Routes JSON requests; the TCP server and InProcessClient both call handle()
+    def __init__(self, ai, max_batch_size=64, max_wait_ms=2.0):
+        self.ai = ai
+        self.batcher = MicroBatcher(ai, max_batch_size, max_wait_ms)
+        self.started = time.time()
+        self.requests = 0
+
+    async def handle(self, method, path, body=b''):
+        # Returns (status, JSON bytes); predictions use their pre-encoded payloads
+        self.requests += 1
+        try:
+            if method == 'GET' and path == '/health':
+                return 200, _encode({'status': 'ok', 'model_loaded': self.ai.model is not None})
+            if method == 'GET' and path == '/stats':
+                return 200, _encode({
+                    'requests': self.requests,
+                    'uptime_s': round(time.time() - self.started, 1),
+                    'batching': self.batcher.stats(),
+                    'cache': self.ai.cache.stats(),
+                    'coalescing': self.ai.flights.stats() if self.ai.flights else None,
+                    'result_store': self.ai.store.stats() if self.ai.store else None,
+                    'model_version': self.ai.live.version if self.ai.live else None,
+                })
+            if method == 'GET' and path == '/metrics':
+                return 200, self.ai.metrics.to_prometheus().encode('utf-8')
+            if method == 'GET' and path == '/metrics.json':
+                return 200, self.ai.metrics.to_json().encode('utf-8')
+            if method == 'POST' and path == '/predict':
+                symptoms = _json_field(body, str)
+                return 200, self.ai.encode_result(await self.batcher.submit(symptoms))
+            if method == 'POST' and path == '/predict_batch':
+                symptoms_list = _json_field(body, list)
+                if not all(isinstance(symptoms, str) for symptoms in symptoms_list):
+                    raise ValueError("'symptoms' must be a list of strings")
+                results = await asyncio.gather(*(self.batcher.submit(s) for s in symptoms_list))
+                return 200, b'{"results": [' + b', '.join(map(self.ai.encode_result, results)) + b']}'
+            return 404, _encode({'error': f'No route for {method} {path}'})
+        except ValueError as exc:
+            return 400, _encode({'error': str(exc)})
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, data = await self.handle(method, path, body)
+                content_type = 'text/plain; version=0.0.4' if path == '/metrics' else 'application/json'
+                keep_alive = headers.get('connection', '').lower() != 'close' and version.strip() == 'HTTP/1.1'
+                writer.write(
+                    f'HTTP/1.1 {status} {_REASONS.get(status, "OK")}\r\n'
+                    f'Content-Type: {content_type}\r\n'
+                    f'Content-Length: {len(data)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        self.batcher.start()
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+class InProcessClient:
+    # Calls the service without sockets, for local tests and load generation
+    def __init__(self, service):
+        self.service = service
+
+    async def get(self, path):
+        status, data = await self.service.handle('GET', path)
+        return status, data.decode('utf-8') if path == '/metrics' else json.loads(data)
+
+    async def post(self, path, payload):
+        status, data = await self.service.handle('POST', path, json.dumps(payload).encode('utf-8'))
+        return status, json.loads(data)
+
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found'}
+
+
+def _encode(payload):
+    return json.dumps(payload).encode('utf-8')
+
+
+def _json_field(body, kind):
+    try:
+        payload = json.loads(body or b'{}')
+    except json.JSONDecodeError:
+        raise ValueError('Request body must be JSON')
+    value = payload.get('symptoms') if isinstance(payload, dict) else None
+    if not isinstance(value, kind):
+        raise ValueError(f"'symptoms' must be a {kind.__name__}")
+    return value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Healthcare AI prediction service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--metrics', action='store_true', help="Record stage timings for /metrics")
+    parser.add_argument('--result-store', metavar='PATH',
+                        help="SQLite file of prediction results shared across workers and restarts")
+    parser.add_argument('--watch-interval', type=float, default=5.0,
+                        help="Seconds between checks for a new model bundle (0 disables)")
+    args = parser.parse_args()
+
+    ai = HealthcareAI(result_store=args.result_store)
+    if args.metrics:
+        ai.metrics.enable()
+    if not (ai.load_bundle() or ai.load()):
+        print("❌ No trained model found. Run Backend.py first to train one.")
+        raise SystemExit(1)
+    if args.watch_interval > 0:
+        ai.watch_bundles(interval=args.watch_interval)
+
+    service = PredictionService(ai, args.max_batch_size, args.max_wait_ms)
+    print(f"🏥 Serving predictions on http://{args.host}:{args.port}")
+    asyncio.run(service.serve(args.host, args.port))
@@ -0,0 +1,188 @@
+"""
+Healthcare AI - Streaming Training Data
+Builds the training and held-out feature matrices from a CSV in two passes
+over fixed-size chunks: the first fits the vectorizer's document statistics,
+the second featurizes each chunk into a sparse block. Raw and cleaned text
+only ever exist one chunk at a time, and the blocks can be spilled to
+memory-mapped files so the assembled matrix lives on disk as well.
+
+Used by HealthcareAI.train(chunk_size=...).
+"""
+
+import os
+import random
+from collections import Counter, defaultdict, deque
+
+import numpy as np
+
+from hashed_features import HashingTfidfVectorizer
+
+
+def read_chunks(dataset_path, chunk_size, preprocess):
+    # Yields (column names, cleaned symptom texts, disease labels) per chunk
+    import pandas as pd
+    for chunk in pd.read_csv(dataset_path, chunksize=chunk_size):
+        yield list(chunk.columns), preprocess(chunk['symptoms']).tolist(), chunk['disease'].astype(str).tolist()
+
+
+class StratifiedSplitter:
+    # Streaming stand-in for train_test_split(stratify=...): within each
+    # disease every 1/test_size-th row goes to the held-out split, starting
+    # at a seeded random phase, so each class keeps the requested share
+    def __init__(self, test_size=0.15, random_state=42):
+        self.test_size = test_size
+        self.seen = Counter()
+        self.phase = defaultdict(random.Random(random_state).random)
+
+    def test_mask(self, labels):
+        mask = np.zeros(len(labels), dtype=bool)
+        for row, label in enumerate(labels):
+            seen, phase = self.seen[label], self.phase[label]
+            mask[row] = int((seen + 1 + phase) * self.test_size) > int((seen + phase) * self.test_size)
+            self.seen[label] = seen + 1
+        return mask
+
+
+class SpilledCSR:
+    # Appends CSR blocks to flat files and reopens them as one memory-mapped
+    # csr_matrix; float32 values match what the forest converts to anyway
+    def __init__(self, directory, name, n_features):
+        os.makedirs(directory, exist_ok=True)
+        self.paths = {part: os.path.join(directory, f'{name}_{part}.bin') for part in ('data', 'indices')}
+        self.files = {part: open(path, 'wb') for part, path in self.paths.items()}
+        self.n_features = n_features
+        self.row_nnz = []
+
+    def append(self, block):
+        self.files['data'].write(block.data.astype(np.float32).tobytes())
+        self.files['indices'].write(block.indices.astype(np.int32).tobytes())
+        self.row_nnz.append(np.diff(block.indptr))
+
+    def finish(self):
+        from scipy import sparse
+        for f in self.files.values():
+            f.close()
+        row_nnz = np.concatenate(self.row_nnz) if self.row_nnz else np.zeros(0, dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(row_nnz)]).astype(np.int64)
+
+        def mapped(part, dtype):
+            if not indptr[-1]:
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(self.paths[part], dtype=dtype, mode='r', shape=(int(indptr[-1]),))
+
+        return sparse.csr_matrix((mapped('data', np.float32), mapped('indices', np.int32), indptr),
+                                 shape=(len(row_nnz), self.n_features), copy=False)
+
+
+class _BlockList:
+    # In-memory counterpart of SpilledCSR
+    def __init__(self, n_features):
+        self.blocks = []
+        self.n_features = n_features
+
+    def append(self, block):
+        self.blocks.append(block)
+
+    def finish(self):
+        from scipy import sparse
+        if not self.blocks:
+            return sparse.csr_matrix((0, self.n_features))
+        return sparse.vstack(self.blocks, format='csr')
+
+
+def _fit_tfidf_vocabulary(vectorizer, chunks):
+    # Same vocabulary and smoothed IDF TfidfVectorizer.fit would produce,
+    # from n-gram counts accumulated chunk by chunk
+    from sklearn.feature_extraction.text import CountVectorizer
+    counter = CountVectorizer(analyzer=vectorizer.build_analyzer())
+    document_frequency, term_frequency, n_documents = Counter(), Counter(), 0
+    for texts in chunks:
+        if not texts:
+            continue
+        # Per-chunk counts in sklearn's own loop, merged term by term
+        X = counter.fit_transform(texts)
+        terms = counter.get_feature_names_out().tolist()
+        term_frequency.update(dict(zip(terms, np.asarray(X.sum(axis=0)).ravel().tolist())))
+        document_frequency.update(dict(zip(terms, np.bincount(X.indices, minlength=len(terms)).tolist())))
+        n_documents += len(texts)
+
+    high = vectorizer.max_df if isinstance(vectorizer.max_df, int) else vectorizer.max_df * n_documents
+    low = vectorizer.min_df if isinstance(vectorizer.min_df, int) else vectorizer.min_df * n_documents
+    terms = sorted(term for term, df in document_frequency.items() if low <= df <= high)
+    if vectorizer.max_features is not None and len(terms) > vectorizer.max_features:
+        # Same argsort over the same alphabetical array, so ties at the cut
+        # fall the way they do in sklearn
+        frequency = np.array([term_frequency[term] for term in terms], dtype=np.int64)
+        kept = np.sort((-frequency).argsort()[:vectorizer.max_features])
+        terms = [terms[i] for i in kept]
+    if not terms:
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+    vectorizer.set_params(vocabulary={term: i for i, term in enumerate(terms)})
+    vectorizer.fit([''])
+    frequency = np.array([document_frequency[term] for term in terms], dtype=np.float64)
+    vectorizer.idf_ = np.log((1 + n_documents) / (1 + frequency)) + 1
+    return vectorizer
+
+
+def _fit_hashing_idf(vectorizer, chunks):
+    document_frequency, n_documents = np.zeros(vectorizer.n_features), 0
+    for texts in chunks:
+        X = vectorizer._term_frequencies(texts, dense=False)
+        document_frequency += np.bincount(X.indices, minlength=vectorizer.n_features)
+        n_documents += len(texts)
+    vectorizer.idf_ = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+    return vectorizer
+
+
+class StreamedDataset:
+    def __init__(self, X_train, X_test, y_train, y_test, columns, replay):
+        self.X_train = X_train
+        self.X_test = X_test
+        self.y_train = y_train
+        self.y_test = y_test
+        self.columns = columns
+        self.replay = replay
+
+
+def stream_dataset(dataset_path, vectorizer, preprocess, chunk_size=50_000, spill_dir=None,
+                   test_size=0.15, random_state=42, replay_per_disease=20):
+    # Pass 1 decides the split and fits the vectorizer on the training rows;
+    # pass 2 featurizes each chunk and routes its rows to train or test
+    splitter = StratifiedSplitter(test_size, random_state)
+    masks, columns = [], None
+
+    def training_texts():
+        nonlocal columns
+        for columns, texts, labels in read_chunks(dataset_path, chunk_size, preprocess):
+            mask = splitter.test_mask(labels)
+            masks.append(mask)
+            yield [text for text, held_out in zip(texts, mask) if not held_out]
+
+    if isinstance(vectorizer, HashingTfidfVectorizer):
+        _fit_hashing_idf(vectorizer, training_texts())
+    else:
+        _fit_tfidf_vocabulary(vectorizer, training_texts())
+
+    n_features = len(vectorizer.idf_)
+    if spill_dir is None:
+        train_store, test_store = _BlockList(n_features), _BlockList(n_features)
+    else:
+        train_store = SpilledCSR(spill_dir, 'train', n_features)
+        test_store = SpilledCSR(spill_dir, 'test', n_features)
+    y_train, y_test = [], []
+    replay = defaultdict(lambda: deque(maxlen=replay_per_disease))
+    for mask, (_, texts, labels) in zip(masks, read_chunks(dataset_path, chunk_size, preprocess)):
+        block = vectorizer.transform(texts).tocsr()
+        train_rows, test_rows = np.flatnonzero(~mask), np.flatnonzero(mask)
+        train_store.append(block[train_rows])
+        test_store.append(block[test_rows])
+        y_train.extend(labels[i] for i in train_rows)
+        y_test.extend(labels[i] for i in test_rows)
+        for i in train_rows:
+            replay[labels[i]].append([texts[i], labels[i]])
+
+    return StreamedDataset(
+        train_store.finish(), test_store.finish(), np.asarray(y_train), np.asarray(y_test),
+        columns, [row for rows in replay.values() for row in rows],
+    )
@@ -0,0 +1,200 @@
+"""
+Healthcare AI - Hyperparameter Search
+Grid or successive-halving search over TF-IDF and Random Forest settings.
+Candidates train in a process pool; TF-IDF matrices are fitted once per
+distinct vectorizer configuration and shared by every forest that uses it.
+Each candidate reports accuracy, train time, size on disk and p50/p99
+single-prediction latency, so a point on the accuracy/latency frontier
+can be picked instead of guessed.
+
+Run: python tune.py --search halving --jobs 4 --output tuning.json
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import accuracy_score
+
+from Backend import FOREST_PARAMS, VECTORIZER_PARAMS, preprocess_series, split_dataset
+
+VECTORIZER_GRID = {
+    'max_features': [500, 1000, 2000],
+    'ngram_range': [(1, 2), (1, 3)],
+}
+
+FOREST_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [20, 30],
+    'min_samples_leaf': [1, 2],
+}
+
+# Fitted features per vectorizer key; filled in the parent before the pool
+# forks so workers read it copy-on-write
+_FEATURES = {}
+_SPLIT = None
+
+
+def _expand(grid, base):
+    names = sorted(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield {**base, **dict(zip(names, values))}
+
+
+def _vectorizer_key(params):
+    return json.dumps(params, sort_keys=True, default=list)
+
+
+def _features(vectorizer_params):
+    key = _vectorizer_key(vectorizer_params)
+    if key not in _FEATURES:
+        X_train, X_test, _, _ = _SPLIT
+        start = time.perf_counter()
+        vectorizer = TfidfVectorizer(**vectorizer_params)
+        X_train_tfidf = vectorizer.fit_transform(X_train)
+        X_test_tfidf = vectorizer.transform(X_test)
+        _FEATURES[key] = (vectorizer, X_train_tfidf, X_test_tfidf, time.perf_counter() - start)
+    return _FEATURES[key]
+
+
+def _latency(vectorizer, model, texts):
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        model.predict_proba(vectorizer.transform([text]))
+        timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1000, np.percentile(timings, 99) * 1000
+
+
+def evaluate(vectorizer_params, forest_params, train_rows=None, latency_samples=200):
+    _, X_test, y_train, y_test = _SPLIT
+    vectorizer, X_train_tfidf, X_test_tfidf, vectorize_time = _features(vectorizer_params)
+    if train_rows is not None and train_rows < X_train_tfidf.shape[0]:
+        # Successive-halving rung: a stratified-enough prefix of the shuffled split
+        X_train_tfidf, y_train = X_train_tfidf[:train_rows], y_train[:train_rows]
+
+    # One core per candidate; the pool provides the parallelism
+    params = {**forest_params, 'n_jobs': 1, 'oob_score': False}
+    model = RandomForestClassifier(**params)
+    start = time.perf_counter()
+    model.fit(X_train_tfidf, y_train)
+    fit_time = time.perf_counter() - start
+    accuracy = accuracy_score(y_test, model.predict(X_test_tfidf))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'candidate.pkl')
+        joblib.dump((model, vectorizer), path)
+        size_mb = os.path.getsize(path) / 1e6
+
+    p50_ms, p99_ms = _latency(vectorizer, model, list(X_test[:latency_samples]))
+    return {
+        'vectorizer': vectorizer_params,
+        'forest': {k: v for k, v in params.items() if k != 'n_jobs'},
+        'train_rows': int(X_train_tfidf.shape[0]),
+        'accuracy': round(float(accuracy), 4),
+        'train_time_s': round(vectorize_time + fit_time, 3),
+        'size_mb': round(size_mb, 2),
+        'p50_ms': round(float(p50_ms), 3),
+        'p99_ms': round(float(p99_ms), 3),
+    }
+
+
+def _evaluate_task(task):
+    return evaluate(*task)
+
+
+def _run(tasks, jobs):
+    if jobs <= 1:
+        return [evaluate(*task) for task in tasks]
+    methods = mp.get_all_start_methods()
+    context = mp.get_context('fork' if 'fork' in methods else 'spawn')
+    if context.get_start_method() != 'fork':
+        # Spawned workers cannot see the parent's caches; they refit per task
+        return [evaluate(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+        return list(pool.map(_evaluate_task, tasks))
+
+
+def search(dataset_path='dataset_improved.csv', strategy='grid', jobs=None,
+           vectorizer_grid=None, forest_grid=None, eta=3, min_rows=500):
+    global _SPLIT
+    df = pd.read_csv(dataset_path)
+    df['symptoms_clean'] = preprocess_series(df['symptoms'])
+    X_train, X_test, y_train, y_test = split_dataset(df)
+    _SPLIT = (X_train, X_test.reset_index(drop=True), y_train.to_numpy(), y_test.to_numpy())
+    jobs = jobs or os.cpu_count() or 1
+
+    candidates = [(v, f) for v in _expand(vectorizer_grid or VECTORIZER_GRID, VECTORIZER_PARAMS)
+                  for f in _expand(forest_grid or FOREST_GRID, FOREST_PARAMS)]
+
+    # Fit each distinct vectorizer once, before the pool forks
+    for vectorizer_params in {_vectorizer_key(v): v for v, _ in candidates}.values():
+        _features(vectorizer_params)
+    print(f"🔧 {len(candidates)} candidates, {len(_FEATURES)} shared TF-IDF matrices, {jobs} workers")
+
+    if strategy == 'grid':
+        return _run([(v, f, None) for v, f in candidates], jobs)
+
+    # Successive halving: train everyone on a small slice, keep the best 1/eta,
+    # grow the slice by eta and repeat until the full training set is used
+    total_rows, rows, results = len(y_train), min_rows, []
+    while True:
+        rows = min(rows, total_rows)
+        rung = _run([(v, f, rows) for v, f in candidates], jobs)
+        results.extend(rung)
+        print(f"🌲 {len(candidates)} candidates on {rows} rows")
+        if rows >= total_rows or len(candidates) <= 1:
+            return results
+        ranked = sorted(range(len(rung)), key=lambda i: rung[i]['accuracy'], reverse=True)
+        candidates = [candidates[i] for i in ranked[:max(1, len(candidates) // eta)]]
+        rows *= eta
+
+
+def pareto_front(results):
+    # Candidates not beaten on both accuracy and p99 latency by another one
+    full = max(r['train_rows'] for r in results)
+    finalists = [r for r in results if r['train_rows'] == full]
+    return [r for r in finalists
+            if not any(o['accuracy'] >= r['accuracy'] and o['p99_ms'] < r['p99_ms'] for o in finalists)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search TF-IDF and forest settings for HealthcareAI")
+    parser.add_argument('--dataset', default='dataset_improved.csv')
+    parser.add_argument('--search', choices=('grid', 'halving'), default='grid')
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--grid', help="JSON file with 'vectorizer' and 'forest' grids")
+    parser.add_argument('--output', default='tuning_results.json')
+    args = parser.parse_args()
+
+    vectorizer_grid = forest_grid = None
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+        vectorizer_grid = {k: [tuple(v) if isinstance(v, list) else v for v in values]
+                           for k, values in grid.get('vectorizer', VECTORIZER_GRID).items()}
+        forest_grid = grid.get('forest', FOREST_GRID)
+
+    results = search(args.dataset, args.search, args.jobs, vectorizer_grid, forest_grid)
+    front = pareto_front(results)
+
+    print(f"\n{'='*60}")
+    print("📊 Accuracy / latency frontier")
+    print(f"{'='*60}")
+    for r in sorted(front, key=lambda r: r['p99_ms']):
+        print(f"{r['accuracy']*100:6.2f}%  p50 {r['p50_ms']:6.2f}ms  p99 {r['p99_ms']:6.2f}ms  "
+              f"{r['size_mb']:7.1f}MB  {r['train_time_s']:6.1f}s  {r['vectorizer']} {r['forest']}")
+
+    with open(args.output, 'w') as f:
+        json.dump({'results': results, 'pareto_front': front}, f, indent=2, default=list)
+    print(f"\n💾 {len(results)} results saved to {args.output}")
@@ -0,0 +1,237 @@
+"""
+Healthcare AI - Multi-process Serving Pool
+The parent memory-maps the exported model arrays once; forked workers
+inherit the mapping, so every worker reads the same physical pages instead
+of unpickling its own forest. Each worker has its own pipe, so the parent
+knows which requests a worker holds: if it dies, those requests fail and a
+fresh worker takes its place. reload() swaps in freshly exported arrays
+without a restart.
+"""
+
+import multiprocessing as mp
+import os
+import threading
+import uuid
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+
+from forest_arrays import ARRAYS_DIR
+from Backend import HealthcareAI
+
+# Model handed to forked workers without pickling it
+_PRELOADED = None
+
+
+def _load_ai(arrays_dir):
+    ai = HealthcareAI(cache_size=0)
+    if not ai.load_arrays(arrays_dir):
+        raise FileNotFoundError(f"No exported model arrays in {arrays_dir!r}; run train() first")
+    return ai
+
+
+def _worker_main(conn, generation, arrays_dir):
+    ai = _PRELOADED or _load_ai(arrays_dir)
+    seen = generation.value
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        request_id, texts = task
+        try:
+            if generation.value != seen:
+                # Graceful reload: pick up new arrays between requests
+                seen = generation.value
+                ai = _load_ai(arrays_dir)
+            conn.send((request_id, ai.predict_batch(texts), None))
+        except Exception as exc:
+            conn.send((request_id, None, f'{type(exc).__name__}: {exc}'))
+
+
+class _Worker:
+    # One worker process, its end of the pipe and the requests sent to it
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.requests = set()
+        self.send_lock = threading.Lock()
+
+
+class PredictionPool:
+    def __init__(self, workers=None, arrays_dir=ARRAYS_DIR):
+        self.workers = workers or os.cpu_count() or 1
+        self.arrays_dir = arrays_dir
+        methods = mp.get_all_start_methods()
+        self._context = mp.get_context('fork' if 'fork' in methods else 'spawn')
+        self._workers = []
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._dispatcher = None
+        self._closing = False
+
+    def start(self):
+        global _PRELOADED
+        if self._workers:
+            return self
+        self._closing = False
+        self._generation = self._context.Value('i', 0)
+        if self._context.get_start_method() == 'fork':
+            _PRELOADED = _load_ai(self.arrays_dir)
+        self._workers = [self._spawn() for _ in range(self.workers)]
+        _PRELOADED = None
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        return self
+
+    def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self._generation, self.arrays_dir),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def _dispatch(self):
+        watched = list(self._workers)
+        while watched:
+            ready = set(wait([w.conn for w in watched] + [w.process.sentinel for w in watched]))
+            for worker in list(watched):
+                if worker.conn in ready:
+                    self._receive(worker)
+                if worker.process.sentinel not in ready:
+                    continue
+                # The worker exited: take in anything it answered first
+                while self._receive(worker):
+                    pass
+                watched.remove(worker)
+                self._fail_requests(worker)
+                if not self._closing:
+                    replacement = self._restart(worker)
+                    if replacement is not None:
+                        watched.append(replacement)
+
+    def _receive(self, worker):
+        try:
+            if not worker.conn.poll():
+                return False
+            request_id, results, error = worker.conn.recv()
+        except (EOFError, OSError):
+            return False
+        with self._lock:
+            worker.requests.discard(request_id)
+            future = self._pending.pop(request_id, None)
+        if future is not None:
+            if error is None:
+                future.set_result(results)
+            else:
+                future.set_exception(RuntimeError(error))
+        return True
+
+    def _fail_requests(self, worker):
+        # A worker killed mid-request (OOM, segfault) never answers it
+        process = worker.process
+        process.join(timeout=1)
+        with self._lock:
+            futures = [self._pending.pop(request_id, None) for request_id in worker.requests]
+            worker.requests.clear()
+        for future in futures:
+            if future is not None:
+                future.set_exception(RuntimeError(
+                    f"Worker {process.pid} exited with code {process.exitcode} before answering"))
+
+    def _restart(self, worker):
+        with self._lock:
+            if self._closing or worker not in self._workers:
+                return None
+            print(f"⚠️ Worker {worker.process.pid} exited with code {worker.process.exitcode}; restarting it")
+            replacement = self._spawn()
+            self._workers[self._workers.index(worker)] = replacement
+        worker.conn.close()
+        return replacement
+
+    def submit(self, symptoms_list):
+        future = Future()
+        request_id = uuid.uuid4().hex
+        with self._lock:
+            if not self._workers:
+                raise RuntimeError("PredictionPool is not running; call start() first")
+            # Send to the worker with the fewest requests outstanding
+            worker = min(self._workers, key=lambda w: len(w.requests))
+            worker.requests.add(request_id)
+            self._pending[request_id] = future
+        try:
+            with worker.send_lock:
+                worker.conn.send((request_id, list(symptoms_list)))
+        except OSError as exc:
+            # The worker is gone; the dispatcher fails the request unless it already has
+            with self._lock:
+                worker.requests.discard(request_id)
+                lost = self._pending.pop(request_id, None)
+            if lost is not None:
+                lost.set_exception(RuntimeError(f"Worker {worker.process.pid} is unavailable: {exc}"))
+        return future
+
+    def predict_batch(self, symptoms_list, timeout=None):
+        return self.submit(symptoms_list).result(timeout)
+
+    def predict(self, symptoms, timeout=None):
+        return self.predict_batch([symptoms], timeout)[0]
+
+    def reload(self):
+        # Workers finish their current request on the old arrays, then remap
+        with self._generation.get_lock():
+            self._generation.value += 1
+
+    def memory(self):
+        # Per-worker memory from /proc (Linux): shared pages are only counted
+        # once in pss, and private_mb is what each extra worker really costs
+        usage = {}
+        for process in [worker.process for worker in self._workers]:
+            fields = {}
+            try:
+                with open(f'/proc/{process.pid}/smaps_rollup') as f:
+                    for line in f:
+                        name, _, value = line.partition(':')
+                        if value.strip().endswith('kB'):
+                            fields[name] = int(value.split()[0]) / 1024.0
+            except OSError:
+                continue
+            usage[process.pid] = {
+                'rss_mb': round(fields.get('Rss', 0.0), 1),
+                'pss_mb': round(fields.get('Pss', 0.0), 1),
+                'private_mb': round(fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0), 1),
+            }
+        return usage
+
+    def close(self):
+        with self._lock:
+            self._closing = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(timeout=5)
+        # The dispatcher returns once it has seen every worker exit
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=5)
+            self._dispatcher = None
+        for worker in workers:
+            worker.conn.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()